@@ -0,0 +1,63 @@
+# ---------------------------------------------------------------------------------
+# 	physicsSimulations/scatteringSim -> scatteringImportTime.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python 
+import sys
+import subprocess
+
+# Import time budget for the scattering package (seconds). Simulations are started 
+# in worker processes, so import cost is paid once per worker (spawn) or job. 
+budget = 0.5
+
+# Modules which the scattering package must not load
+forbidden = ["matplotlib"]
+
+# Program to measure the import time of physicsUtilities.scattering in a fresh 
+# interpreter and check it against the budget
+if __name__ == "__main__":
+
+	modules = [
+		"physicsUtilities.scattering.scatteringMonteCarlo", 
+		"physicsUtilities.scattering.ensembleMonteCarlo"
+	]
+
+	# Measure in a fresh interpreter such that nothing is preloaded
+	script = "; ".join( [
+		"import sys, time",
+		"t = time.perf_counter()",
+		"import %s"%", ".join(modules),
+		"print( time.perf_counter() - t )",
+		"print( ','.join( [ _m for _m in %s if _m in sys.modules ] ) )"%forbidden
+	] )
+
+	output = subprocess.run( [sys.executable, "-c", script], capture_output = True, text = True, check = True )
+	seconds, loaded = output.stdout.split("\n")[:2]
+
+	print("Import time: %.3fs (budget %.3fs)"%( float(seconds), budget ) )
+	print("Forbidden modules loaded: %s"%( loaded if loaded else "none" ) )
+
+	# Fail if over budget or if forbidden modules are loaded
+	sys.exit( 0 if float(seconds) < budget and not loaded else 1 )
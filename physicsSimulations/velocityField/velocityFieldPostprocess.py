@@ -25,147 +25,350 @@
 #
 
 #!/usr/bin/env python
+import os
+import copy
 import numpy as np
 import pickle as p
 
-# Import matplotlib
-import matplotlib.pyplot as plt
+# Import async factory (multiprocessing)
+from physicsUtilities.utilities.asyncFactory import asyncFactory
 
-# Import physical and material constants
-from physicsUtilities.solidstate.materialConstants import GaAs
+# Import columnar result store
+from velocityFieldStore import loadSimulation
+from velocityFieldStore import loadPostprocess
 
-# Routines to postprocess velocity field simulation data. This routine 
-# averages velocity for each simulation and produces a composite average 
-# over all simulations.
-if __name__ == "__main__":
+# Method to calculate valley dwell times from a trajectory. The time elapsed 
+# between event i-1 and event i is assigned to the valley of event i. Trajectories 
+# of an ensemble (shape (events, electrons)) are reduced along the event axis.
+def dwellTimes(time, valley, valleys = ("G", "L")):
 
-	# List of simulation datafiles to postprocess
-	if True:
+	tau 	= np.diff( np.asarray(time), axis = 0 )
+	valley 	= np.asarray(valley)[1:]
 
-		# Set simulation name
-		simulation_name = "GaAs-20kV"
+	return { _v : np.sum( tau[ valley == _v ] ) for _v in valleys }
 
-		# Build simulation paths
-		paths = [ "./data/simulation/%s.%s"%(simulation_name, int(_)) for _ in range(25) ]
-		
-		# Path to output file
-		postprocess_path = "./data/postprocess/%s-2.5e6.dat"%simulation_name
+# Method to return the valley names of a simulation result
+def resultValleys(result):
 
-	# For working with single files
-	else:	
+	if hasattr(result, "valleys"):
 
-		paths = ["./data/simulation/GaAs-20kV.4"]
-		postprocess_path = "./data/postprocess/tmp.dat"
+		return list(result.valleys)
 
-	# Dictionary to hold processed data
-	postprocess_data = {}
+	if "valleys" in result:
 
-	# Read back data object from each simulation datafile	
-	for _path in paths:
-	
-		# Processing path
-		print("Processing path: %s"%_path)
+		return list(result["valleys"])
 
-		data = p.load( open( _path, "rb" ) )
+	return ["G", "L"]
 
-		# Dictionary to store postprocessed data
-		postprocess = { 
-			"field" 	: [], 
-			"energy"	: [], 
-			"velocity"	: [], 
-			"valley"	: {"G" : [], "L" : []}, 
-			"events"	: 0 
-		} 
+# Method to postprocess a single field result. Returns a dictionary with energy, 
+# velocity, valley dwell times and number of events, and the event sums (sum, sumsq) 
+# of energy and velocity. Statistics only results (trajectoryStatistics) carry time 
+# averaged velocity, energy and valley dwell times. Velocity is reported as drift 
+# velocity (-1.0 * velocity).
+def postprocessField(result, statistics = False):
 
-		# Store electric field 
-		postprocess["field"] = data["config"]["field"]
+	if statistics:
 
-		# Store the number of events
-		postprocess["events"] = data["config"]["events"]
+		# Event sums are attributes of trajectoryStatistics, and group attributes
+		# in a columnar store (NaN if not stored)
+		sums, sumsq = ( result.sum, result.sumsq ) if hasattr(result, "sumsq") else \
+			( result["sum"], result["sumsq"] ) if "sumsq" in result else \
+			( {"energy" : np.nan, "velocity" : np.nan}, {"energy" : np.nan, "velocity" : np.nan} )
 
-		# Loop through simulation data
-		for field in data["config"]["field"]:
+		return {
+			"energy"	: result["energy"], 
+			"velocity"	: -1.0 * result["velocity"], 
+			"valley"	: dict( result["valley"] ), 
+			"events"	: result["events"],
+			"sum"		: {"energy" : sums["energy"], "velocity" : -1.0 * sums["velocity"]},
+			"sumsq"		: dict(sumsq)
+		}
 
-			# Electron energy
-			postprocess["energy"].append( -1.0 * np.mean( data["Simulation.result"][field]["velocity"] ) ) 
+	time, valley = result["time"], result["valley"]
+	energy, velocity = np.asarray( result["energy"], dtype=np.float64 ), np.asarray( result["velocity"], dtype=np.float64 )
 
-			# Electron drift velocity
-			postprocess["velocity"].append( -1.0 * np.mean( data["Simulation.result"][field]["velocity"] ) ) 
+	# Ensemble results in a columnar store are stored flattened
+	if "shape" in result:
 
-			# Calculate valley occupancy ratio	
-			Gsum, Lsum = 0.0, 0.0
+		time, valley = np.reshape( time, result["shape"] ), np.reshape( valley, result["shape"] )
 
-			# Loop through all fields
-			for _index, _data in enumerate( 
+	return {
+		"energy"	: np.mean( energy ), 
+		"velocity"	: -1.0 * np.mean( velocity ), 
+		"valley"	: dwellTimes( time, valley, resultValleys(result) ), 
+		"events"	: len(time),
+		"sum"		: {"energy" : np.sum( energy ), "velocity" : -1.0 * np.sum( velocity )},
+		"sumsq"		: {"energy" : np.sum( energy**2 ), "velocity" : np.sum( velocity**2 )}
+	}
 
-				zip( data["Simulation.result"][field]["time"], data["Simulation.result"][field]["valley"] ) ):
+# Method to postprocess a simulation datafile. Returns (path, postprocess) such 
+# that results can be collected from a process pool. Besides averages per field, 
+# postprocess["moments"] holds the mergeable event counts, sums and sums of squares
+# of energy and velocity per field.
+def postprocessSimulation(path):
 
-				# Lookback protection
-				if _index > 0:
+	# Processing path
+	print("Processing path: %s"%path)
 
-					# Calculate occupancy time
-					tau = _data[0] - data["Simulation.result"][field]["time"][_index - 1]
+	data = loadSimulation( path )
 
-					if data["Simulation.result"][field]["valley"][_index] == "G":
+	# Chunked simulations always accumulate statistics
+	statistics = ( "statistics" in data["config"] and data["config"]["statistics"] ) or "chunk" in data["config"]
 
-						Gsum += tau 
+	# Dictionary to store postprocessed data
+	postprocess = { 
+		"field" 	: data["config"]["field"], 
+		"energy"	: [], 
+		"velocity"	: [], 
+		"valley"	: {}, 
+		"events"	: data["config"]["events"],
+		"moments"	: {
+			"events": [],
+			"sum" 	: {"energy" : [], "velocity" : []}, 
+			"sumsq" : {"energy" : [], "velocity" : []}
+		}
+	} 
 
-					if data["Simulation.result"][field]["valley"][_index] == "L":
+	# Loop through simulation data
+	for field in data["config"]["field"]:
 
-						Lsum += tau
-		
-			# Append occupancy times to postprocess data
-			postprocess["valley"]["G"].append( Gsum )
-			postprocess["valley"]["L"].append( Lsum )
+		result = postprocessField( data["Simulation.result"][field], statistics )
 
-			# Store number of events
-			postprocess["events"] = len(data["Simulation.result"][field]["time"])
+		postprocess["energy"].append( result["energy"] )
+		postprocess["velocity"].append( result["velocity"] )
+		postprocess["events"] = result["events"]
 
-			# Append data to dictionary
-			postprocess_data[_path] = postprocess
+		for _v, _tau in result["valley"].items():
 
+			postprocess["valley"].setdefault(_v, []).append( _tau )
 
-	# Produce the composite average of simulations
-	# Initialization lambda returns a zero valued list
-	composite_init = lambda: np.zeros( len(data["config"]["field"]) )
+		postprocess["moments"]["events"].append( result["events"] )
 
-	# Length of composite
-	composite_len = len(postprocess_data.keys())
+		for _k in ["energy", "velocity"]:
 
-	# Composite data structure
-	composite = {
-	
-		"field" 	: data["config"]["field"], 
-		"energy"	: composite_init(), 		
-		"velocity"	: composite_init(), 
-		"valley"	: {"G" : composite_init(), "L" : composite_init()}, 
-		"events"	: 0 
+			postprocess["moments"]["sum"][_k].append( result["sum"][_k] )
+			postprocess["moments"]["sumsq"][_k].append( result["sumsq"][_k] )
+
+	return path, postprocess
+
+# Method to return the standard error of the mean of n samples, given their sum 
+# and sum of squares. Returns inf for less than two samples.
+def standardError(n, sum, sumsq):
+
+	if n < 2:
+
+		return np.full( np.shape(sum), np.inf )
+
+	return np.sqrt( np.maximum( sumsq - sum**2 / n, 0.0 ) / ( n - 1 ) / n )
+
+# Method to mark a run postprocessed before event moments were kept. These runs
+# stored the average velocity in "energy", so their energies are set to NaN.
+def legacyRun(run):
+
+	if "moments" in run:
+
+		return run
+
+	return dict( run, energy = np.full( np.shape( run["energy"] ), np.nan ) )
+
+# Method to fold postprocessed simulations into a composite. The composite keeps 
+# sufficient statistics over runs (number of runs, sums and sums of squares of 
+# the run averages), such that new runs are merged in O(new data) without 
+# reprocessing earlier runs. Runs are independent, so the scatter of the run 
+# averages gives the standard error of the composite average:
+#
+#	composite["velocity"]			-> average over runs
+#	composite["error"]["velocity"]	-> standard error of the average
+#
+# Runs with NaN energies (see legacyRun) are left out of the energy average and
+# its standard error, which count composite["energyRuns"] runs. If composite is 
+# None a new composite is created.
+def updateComposite(composite, postprocess_data):
+
+	data = list( postprocess_data.values() )
+
+	if composite is None:
+
+		zeros = lambda: np.zeros( len( data[0]["field"] ) )
+
+		# Composite data structure
+		composite = {
+			"field" 	: data[0]["field"], 
+			"events"	: 0,
+			"runs"		: 0,
+			"energyRuns": 0,
+			"sum"		: {"energy" : zeros(), "velocity" : zeros(), "valley" : { _v : zeros() for _v in data[0]["valley"] }},
+			"sumsq"		: {"energy" : zeros(), "velocity" : zeros(), "valley" : { _v : zeros() for _v in data[0]["valley"] }},
+			"moments"	: {
+				"events": zeros(), 
+				"sum" 	: {"energy" : zeros(), "velocity" : zeros()}, 
+				"sumsq" : {"energy" : zeros(), "velocity" : zeros()}
+			}
+		}
+
+	# Fold runs into sufficient statistics
+	for run in data:
+
+		composite["runs"] 	+= 1
+		composite["events"] += run["events"]
+
+		composite["sum"]["velocity"] 	+= np.asarray( run["velocity"] )
+		composite["sumsq"]["velocity"] 	+= np.asarray( run["velocity"] )**2
+
+		# Energies of legacy runs are not known
+		if not np.all( np.isnan( run["energy"] ) ):
+
+			composite["energyRuns"] += 1
+
+			composite["sum"]["energy"] 	 += np.asarray( run["energy"] )
+			composite["sumsq"]["energy"] += np.asarray( run["energy"] )**2
+
+		for _v in composite["sum"]["valley"]:
+
+			composite["sum"]["valley"][_v] 	 += np.asarray( run["valley"][_v] )
+			composite["sumsq"]["valley"][_v] += np.asarray( run["valley"][_v] )**2
+
+		# Event sums (not available for runs postprocessed without moments)
+		if "moments" in run:
+
+			composite["moments"]["events"] += np.asarray( run["moments"]["events"] )
+
+			for _k in ["energy", "velocity"]:
+
+				composite["moments"]["sum"][_k]   += np.asarray( run["moments"]["sum"][_k] )
+				composite["moments"]["sumsq"][_k] += np.asarray( run["moments"]["sumsq"][_k] )
+
+	# Averages and standard errors over runs
+	n, m = composite["runs"], composite["energyRuns"]
+
+	composite["velocity"] 	= composite["sum"]["velocity"] / n
+	composite["energy"] 	= composite["sum"]["energy"] / m if m > 0 else np.full( np.shape( composite["field"] ), np.nan )
+
+	composite["valley"] = { _v : _sum / n for _v, _sum in composite["sum"]["valley"].items() }
+
+	composite["error"] = {
+		"energy" 	: standardError( m, composite["sum"]["energy"], composite["sumsq"]["energy"] ),
+		"velocity"	: standardError( n, composite["sum"]["velocity"], composite["sumsq"]["velocity"] ),
+		"valley"	: { _v : standardError( n, composite["sum"]["valley"][_v], composite["sumsq"]["valley"][_v] ) 
+			for _v in composite["sum"]["valley"] }
 	}
 
-	for simulation in postprocess_data.keys():
+	return composite
+
+# Method to produce the composite average of postprocessed simulations
+def compositeAverage(postprocess_data):
+
+	return updateComposite( None, postprocess_data )
+
+# Routines to postprocess velocity field simulation data. This routine averages 
+# velocity, energy and valley dwell times for each simulation and produces a 
+# composite average over all simulations. Datafiles are processed in parallel.
+#
+#	postprocess = velocityFieldPostprocess(paths)
+#	postprocess.run()
+#	postprocess.result -> {"composite" : ..., "data" : {path : ...}}
+#
+# Given the result of a previous postprocess, only new datafiles are processed 
+# and folded into the previous composite (see updateComposite).
+class velocityFieldPostprocess:
+
+	def __init__(self, paths, parallel = True, previous = None):
+
+		# Simulation datafiles
+		self.paths 	  = list(paths)
+		self.parallel = parallel
+
+		# Previous postprocess result {"composite", "data"}
+		self.previous = previous
+
+		# Dictionary to store postprocessed data
+		self.data 	= {}
+		self.result = None
+
+	# Postprocess run method
+	def run(self):
+
+		previous = self.previous["data"] if self.previous is not None else {}
+
+		# Datafiles which have not been postprocessed
+		paths = [ _path for _path in self.paths if _path not in previous ]
+
+		if self.parallel and len(paths) > 1:
+
+			factory = asyncFactory()
+
+			for _path in paths:
+
+				factory.call(postprocessSimulation, self.log_result, _path)
+
+			factory.wait()
+
+		else:
+
+			for _path in paths:
+
+				self.log_result( postprocessSimulation(_path) )
+
+		# Keep datafile order
+		data = { _path : self.data[_path] for _path in paths }
+
+		# Fold new datafiles into the previous composite. Composites written before 
+		# sufficient statistics (and energy run counts) were kept are rebuilt from 
+		# their run averages. Legacy runs are kept without energies (see legacyRun).
+		if self.previous is None:
+
+			composite = compositeAverage(data)
 
-		# Sum velocity
-		composite["velocity"] += postprocess_data[simulation]["velocity"]
+		else:
 
-		# Sum energy
-		composite["energy"] += postprocess_data[simulation]["energy"]
+			previous = { _path : legacyRun(_run) for _path, _run in previous.items() }
 
-		# Sum valley scattering times
-		composite["valley"]["G"] += postprocess_data[simulation]["valley"]["G"]
-		composite["valley"]["L"] += postprocess_data[simulation]["valley"]["L"]
+			composite = copy.deepcopy( self.previous["composite"] ) if "energyRuns" in self.previous["composite"] \
+				else compositeAverage(previous)
+
+			composite = updateComposite(composite, data) if len(data) > 0 else composite
+
+		self.result = {"composite" : composite, "data" : dict( previous, **data )}
+
+		return self.result
+
+	def log_result(self, result):
+
+		self.data[ result[0] ] = result[1]
+
+	# Method to dump postprocessed data
+	def dump(self, path):
+
+		p.dump( self.result, open(path, "wb") )
+
+if __name__ == "__main__":
+
+	# List of simulation datafiles to postprocess
+	if True:
+
+		# Set simulation name
+		simulation_name = "GaAs-20kV"
+
+		# Build simulation paths
+		paths = [ "./data/simulation/%s.%s"%(simulation_name, int(_)) for _ in range(25) ]
 		
-		# Sum events
-		composite["events"] += postprocess_data[simulation]["events"]
+		# Path to output file
+		postprocess_path = "./data/postprocess/%s-2.5e6.dat"%simulation_name
+
+	# For working with single files
+	else:	
 
-	# Velocity
-	composite["velocity"] = composite["velocity"] / composite_len
+		paths = ["./data/simulation/GaAs-20kV.4"]
+		postprocess_path = "./data/postprocess/tmp.dat"
 
-	# Energy
-	composite["energy"] = composite["energy"] / composite_len
+	# Fold new simulations into an existing postprocess file
+	previous = loadPostprocess( postprocess_path ) if os.path.exists( postprocess_path ) else None
 
-	# Valley occupancy
-	composite["valley"]["G"] = composite["valley"]["G"] / composite_len
-	composite["valley"]["L"] = composite["valley"]["L"] / composite_len
+	# Postprocess simulations and dump the results
+	postprocess = velocityFieldPostprocess(paths, previous = previous)
+	postprocess.run()
+	postprocess.dump(postprocess_path)
 
-	# Dump the results		
-	p.dump( {"composite" : composite ,"data" : postprocess_data}, open(postprocess_path, "wb") )
+	# Standard error of the composite drift velocity
+	print( "Runs: %s"%postprocess.result["composite"]["runs"] )
+	print( "Velocity standard error (max): %s"%np.max( postprocess.result["composite"]["error"]["velocity"] ) )
@@ -25,22 +25,91 @@
 #
 
 #!/usr/bin/env python
+import json
+import time
+import hashlib
 import numpy as np
-import pickle as p
-
-# Import matplotlib
-import matplotlib.pyplot as plt
 
 # Import async factory (multiprocessing)
 from physicsUtilities.utilities.asyncFactory import asyncFactory
+from physicsUtilities.utilities.asyncFactory import attachArray
 
 # Import physical and material constants
 from physicsUtilities.solidstate.materialConstants import GaAs
 
+# Import scattering rates and shared memory scattering rates
+from physicsUtilities.solidstate.materialScatteringRates import materialScatteringRates
+import physicsUtilities.solidstate.sharedScatteringRates as sharedRates
+
 # Import Monte Carlo simulation
 from physicsUtilities.scattering.scatteringMonteCarlo import scatteringMonteCarlo
+from physicsUtilities.scattering.ensembleMonteCarlo import ensembleMonteCarlo
+from physicsUtilities.scattering.trajectoryStatistics import trajectoryStatistics
+from physicsUtilities.scattering.trajectoryResult import trajectoryResult
+
+# Import JSON encoding of configuration data
+from physicsUtilities.utilities.columnarStore import encodeJSON
+
+# Import columnar result store
+from velocityFieldStore import writeSimulation
+from velocityFieldStore import loadManifest, writeManifest
+from velocityFieldStore import loadCheckpoint, writeCheckpoint
+
+# Optional simulation settings of single field simulations. Pooled and shared 
+# memory fields use the same settings, such that they give identical results.
+fieldKeys = ["bands", "statistics", "target", "batch", "maxEvents", "precision"]
+
+# Settings which change field results. A checkpoint records a digest of these 
+# settings, the material and the energy grid (see velocityFieldSimulation.settings)
+settingKeys = ["statistics", "bands", "warmup", "chunk", "target", "batch", "maxEvents", "precision", "interpolate", "alias"]
+
+# Discarded events per chunk of a chunked field (see run_chunked). Chunks start cold
+# and relax within a few hundred events (slowest near the onset of intervalley 
+# transfer); the default leaves a wide margin.
+chunkWarmup = 2000
+
+# Simulate a single field writing the trajectory into row of the shared result 
+# buffers (see velocityFieldSimulation.reserve_columns). The task is a module level
+# function, such that only the field configuration and the buffer descriptors are 
+# sent to the worker. Returns a small descriptor (row, size, valleys, metadata) 
+# instead of the trajectory. If the trajectory outgrows the buffers (e.g. extended
+# to a target standard error), the result is returned.
+def simulateFieldShared(config, row, descriptors):
+
+	# Confirmation
+	print("Simulating: %s"%config["field"])
+
+	columns = { _k : attachArray(_d)[row] for _k, _d in descriptors.items() }
+
+	# Use scattering rates attached from shared memory (if any)
+	if sharedRates.attachedRates is not None:
+
+		config["rates"] = sharedRates.attachedRates
+
+	# Initialize monte carlo simulation
+	Simulation = scatteringMonteCarlo( dict( config, columns = columns ) )
+	Simulation.randomizeInitial()
+
+	# Run simulation
+	Simulation.run()
+
+	if not np.shares_memory( Simulation.result.columns["time"], columns["time"] ):
+
+		return Simulation.result
+
+	return {"row" : row, "size" : Simulation.result.size, "valleys" : list( Simulation.result.valleys ), "meta" : Simulation.result.meta}
 
 # Simulate electron velocity vs. electric field
+#
+# If the configuration contains "checkpoint" (a directory), each field result is 
+# written to the checkpoint as soon as it is finished, and a manifest records the
+# finished fields and the random number streams (spawn keys) of their results 
+# (see velocityFieldStore). A simulation created with the same checkpoint resumes:
+# finished fields are loaded and only the remaining fields are simulated. If no 
+# seed is given the seed of the checkpoint is used, such that resumed fields draw 
+# from the same streams. Checkpoints written with other settings (settingKeys, 
+# material or energy grid) are rejected. Ensembles simulate all fields at once and
+# cannot be checkpointed.
 class velocityFieldSimulation:
 
 	def __init__(self, config):
@@ -48,47 +117,435 @@ class velocityFieldSimulation:
 		# Configuration data
 		self.config = config
 
+		# Checkpoint manifest
+		self.manifest = loadManifest( self.config["checkpoint"] ) if "checkpoint" in self.config else None
+
+		if self.manifest is not None and ( "seed" not in self.config or self.config["seed"] is None ):
+
+			self.config["seed"] = self.manifest["seed"]
+
+		# Master seed for random number streams. If no seed is given we draw one 
+		# and store it in the configuration such that any field can be replayed.
+		if "seed" not in self.config or self.config["seed"] is None:
+
+			self.config["seed"] = np.random.SeedSequence().entropy
+
 		# Dictionary to store simuilation results
 		self.result = {}
+
+		# Variable Gamma trajectories are not uniform in time. Fields are averaged 
+		# over time only by running statistics (chunked fields always are).
+		if "bands" in self.config and self.config["bands"] is not None and \
+			not ( "statistics" in self.config and self.config["statistics"] ) and "chunk" not in self.config:
+
+			raise ValueError("velocityFieldSimulation: \"bands\" (variable Gamma) requires \"statistics\"")
+
+		if "checkpoint" in self.config and "electrons" in self.config:
+
+			raise ValueError("velocityFieldSimulation: ensemble simulations (\"electrons\") cannot be checkpointed")
+
+		# New checkpoint
+		if "checkpoint" in self.config and self.manifest is None:
+
+			self.manifest = {
+				"seed"		: int( self.config["seed"] ),
+				"field"		: np.asarray( self.config["field"], dtype=np.float64 ).tolist(),
+				"events"	: int( self.config["events"] ),
+				"settings"	: self.settings(),
+				"fields"	: {}
+			}
+
+			writeManifest( self.config["checkpoint"], self.manifest )
+
+		# Check that the checkpoint belongs to this simulation
+		if self.manifest is not None:
+
+			if self.manifest["seed"] != self.config["seed"] or self.manifest["events"] != self.config["events"] or \
+				self.manifest["field"] != np.asarray( self.config["field"], dtype=np.float64 ).tolist():
+
+				raise ValueError("velocityFieldSimulation: checkpoint %s does not match configuration"%self.config["checkpoint"])
+
+			if "settings" not in self.manifest or self.manifest["settings"] != self.settings():
+
+				raise ValueError("velocityFieldSimulation: checkpoint %s was written with other settings"%self.config["checkpoint"])
+
+	# Method to return a digest of the settings which change field results: the 
+	# optional settings (settingKeys), the material parameters and the energy grid
+	def settings(self):
+
+		settings = { _k : self.config[_k] for _k in settingKeys if _k in self.config }
+
+		digest = hashlib.sha256()
+		digest.update( json.dumps( encodeJSON( [settings, self.config["material"]] ), sort_keys = True ).encode() )
+		digest.update( np.ascontiguousarray( self.config["energy"], dtype=np.float64 ).tobytes() )
+
+		return digest.hexdigest()
+
+	# Method to return the random number streams (spawn keys) of the field with 
+	# index, i.e. (index, ) or (index, chunk) for each chunk of a chunked field
+	def field_streams(self, index):
+
+		if "chunk" in self.config:
+
+			return [ [index, _j] for _j in range( len( self.chunk_events() ) ) ]
+
+		return [ [index] ]
+
+	# Method to load finished fields from the checkpoint. Returns the indices of 
+	# finished fields. Fields recorded with other streams than this configuration 
+	# would use (e.g. a different chunk size) are rejected.
+	def resume(self):
+
+		if self.manifest is None:
+
+			return []
+
+		for name, entry in self.manifest["fields"].items():
+
+			if entry["streams"] != self.field_streams( entry["index"] ):
+
+				raise ValueError("velocityFieldSimulation: checkpoint %s recorded streams %s for %s"%( 
+					self.config["checkpoint"], entry["streams"], name ) )
+
+			self.result[ entry["field"] ] = loadCheckpoint( self.config["checkpoint"], name )
+
+		return [ entry["index"] for entry in self.manifest["fields"].values() ]
+
+	# Method to write a field result to the checkpoint. The stored result replaces 
+	# the result in memory (columns are read from disk on access), so it is written 
+	# at the precision of the simulation (config["precision"], default np.float64).
+	# The spawn keys of the random number streams of the result are recorded in the
+	# manifest.
+	def checkpoint(self, sim_result):
+
+		field = sim_result["field"]
+		index = list( self.config["field"] ).index( field )
+		name  = "field_%04d"%index
+
+		# Random number streams of the result (chunked results carry one per chunk)
+		random = sim_result["random"] if isinstance( sim_result["random"], list ) else [ sim_result["random"] ]
+
+		precision = self.config["precision"] if "precision" in self.config else np.float64
+
+		self.result[field] = writeCheckpoint( self.config["checkpoint"], name, sim_result, precision )
+
+		self.manifest["fields"][name] = {
+			"field" 	: float(field), 
+			"index" 	: index, 
+			"streams" 	: [ [ int(_k) for _k in _r["key"] ] for _r in random ]
+		}
+
+		writeManifest( self.config["checkpoint"], self.manifest )
 	
-	# Simulation run method 
+	# Simulation run method. If the configuration contains "electrons", all fields
+	# are simulated in a single ensemble (see run_ensemble). If the configuration 
+	# contains "chunk", each field is split into chunks of events (see run_chunked).
+	# If the configuration contains "shared", trajectories are written into shared 
+	# result buffers instead of being returned through the pool (see reserve_columns).
 	def run(self):
 
-		factory = asyncFactory()
+		# Finished fields (checkpoint)
+		finished = self.resume()
+
+		if len(finished) == len( self.config["field"] ):
+
+			return
+
+		if "electrons" in self.config:
+
+			self.run_ensemble()
+			return
+
+		if "chunk" in self.config:
+
+			self.run_chunked(finished)
+			return
+
+		# Scattering rates are calculated once and published to shared memory. 
+		# Workers attach to the shared tables when the pool starts.
+		shared = sharedRates.sharedScatteringRates( 
+			materialScatteringRates( self.config["energy"], self.config["material"], 
+				cache = self.config["cache"] if "cache" in self.config else None ) )
+
+		factory = asyncFactory( sharedRates.attachScatteringRates, ( shared.descriptor, ) )
+
+		# Trajectories are written into shared result buffers (see reserve_columns)
+		if "shared" in self.config and self.config["shared"] and not ( "statistics" in self.config and self.config["statistics"] ):
+
+			pending = [ _i for _i, _f in enumerate(self.config["field"]) if _i not in finished ]
+
+			self.reserve_columns( factory, len(pending) )
+
+			for _row, _i in enumerate(pending):
+
+				factory.call(simulateFieldShared, self.log_shared, *self.shared_task(_i, _row))
+
+		else:
 		
-		for _f in self.config["field"]: 
+			for _i, _f in enumerate(self.config["field"]): 
 
-			factory.call(self.simulate_field, self.log_result, _f)
+				if _i not in finished:
+
+					factory.call(self.simulate_field, self.log_result, _f, _i)
 
 		factory.wait()
 
-	def simulate_field(self, field):
+		# Free shared scattering rates
+		shared.release()
+
+	# Method to generate the configuration dictionary of a single field simulation
+	def field_config(self, field, stream, events, keys):
+
+		# Generate configuration dictionary
+		config = {
+			"material"	: self.config["material"],
+			"energy"	: self.config["energy"],
+			"events"	: events,
+			"field"		: field,
+			"seed"		: self.config["seed"],
+			"stream"	: stream
+		}
+
+		# Optional simulation settings
+		for key in keys:
+
+			if key in self.config: 
+
+				config[key] = self.config[key]
+
+		# Use scattering rates attached from shared memory (if any)
+		if sharedRates.attachedRates is not None:
+
+			config["rates"] = sharedRates.attachedRates
+
+		return config
+
+	# Simulate a single field. Each field draws from its own random number stream 
+	# (spawn key = field index), so that a field can be replayed from the master 
+	# seed by calling simulate_field(field, index).
+	def simulate_field(self, field, index):
 	
 		# Confirmation
 		print("Simulating: %s"%field)
 
+		# Initialize monte carlo simulation
+		Simulation = scatteringMonteCarlo( self.field_config( field, (index, ), self.config["events"], fieldKeys ) )
+		Simulation.randomizeInitial()
+
+		# Run simulation
+		Simulation.run()
+
+		# Return simulation result
+		return Simulation.result
+
+	# Method to reserve shared result buffers for trajectories of rows fields. Each 
+	# column {"time", "valley", "energy", "velocity"} is a shared array of shape 
+	# (rows, events). Fields extended beyond events to a target standard error 
+	# outgrow their row and are returned through the pool (see simulateFieldShared).
+	def reserve_columns(self, factory, rows):
+
+		precision = self.config["precision"] if "precision" in self.config else np.float64
+		capacity  = self.config["events"]
+
+		dtypes = {"time" : np.float64, "valley" : np.uint8, "energy" : precision, "velocity" : precision}
+
+		self.buffers 	 = { _k : factory.reserve( ( rows, int(capacity) ), _dtype ) for _k, _dtype in dtypes.items() }
+		self.descriptors = { _k : _buffer.descriptor for _k, _buffer in self.buffers.items() }
+
+	# Method to return the arguments of the shared memory task (see simulateFieldShared)
+	# of the field with index, writing into row of the shared result buffers. Tasks 
+	# carry the field configuration and buffer descriptors only.
+	def shared_task(self, index, row):
+
+		config = self.field_config( self.config["field"][index], (index, ), self.config["events"], fieldKeys )
+
+		return config, row, self.descriptors
+
+	# Collect a field written into shared result buffers. The result is a 
+	# trajectoryResult whose columns are views into the buffers.
+	def log_shared(self, descriptor):
+
+		if isinstance(descriptor, trajectoryResult):
+
+			self.log_result(descriptor)
+			return
+
+		result = trajectoryResult( 
+			valleys = descriptor["valleys"],
+			columns = { _k : _buffer.array[ descriptor["row"] ] for _k, _buffer in self.buffers.items() } 
+		)
+
+		result.size  = descriptor["size"]
+		result.meta  = descriptor["meta"]
+		result.owner = self.buffers
+
+		self.log_result(result)
+
+	# Method to split the event budget of a field into chunks of config["chunk"] 
+	# events. The last chunk takes the remainder.
+	def chunk_events(self):
+
+		events, chunk = int( self.config["events"] ), int( self.config["chunk"] )
+
+		sizes = [ chunk ] * ( events // chunk )
+
+		if events % chunk > 0:
+
+			sizes.append( events % chunk )
+
+		return sizes
+
+	# Simulate fields split into independent chunks of config["chunk"] events. All
+	# chunks of all fields are queued on the pool at once and handed out to workers 
+	# as they become free, such that all cores are busy until the sweep ends. Each 
+	# chunk draws from its own random number stream (spawn key = (field index, chunk 
+	# index)) and simulates config["warmup"] discarded events before recording 
+	# (default chunkWarmup). Every chunk starts from the cold initial state (lowest 
+	# valley, E < 0.05 eV), and without warmup each chunk carries the relaxation 
+	# transient into its averages (e.g. drift velocity biased by ~6 standard errors 
+	# at 20 kV/cm with 1000 event chunks). Chunks accumulate running statistics 
+	# (trajectoryStatistics), which are merged per field when the last chunk of a 
+	# field returns. Standard errors are estimated from the scatter of the chunk means.
+	#
+	# Chunk timings are stored in self.timings and in the "chunks" entry of each 
+	# field result as (chunk, events, seconds), to tune the chunk size.
+	def run_chunked(self, finished = ()):
+
+		# Scattering rates are calculated once and published to shared memory
+		shared = sharedRates.sharedScatteringRates( 
+			materialScatteringRates( self.config["energy"], self.config["material"], 
+				cache = self.config["cache"] if "cache" in self.config else None ) )
+
+		factory = asyncFactory( sharedRates.attachScatteringRates, ( shared.descriptor, ) )
+
+		# Chunk results per field index and chunk timings
+		self.chunks  = {}
+		self.timings = []
+
+		sizes = self.chunk_events()
+
+		for _i, _f in enumerate(self.config["field"]): 
+
+			if _i in finished:
+
+				continue
+
+			self.chunks[_i] = [ None for _ in sizes ]
+
+			for _j, _n in enumerate(sizes):
+
+				factory.call(self.simulate_chunk, self.log_chunk, _f, _i, _j, _n)
+
+		factory.wait()
+
+		# Free shared scattering rates
+		shared.release()
+
+		# Report chunk timings
+		if len(self.timings) > 0:
+
+			seconds = np.array( [ _t["seconds"] for _t in self.timings ] )
+
+			print("Chunks: %d, seconds per chunk (min/mean/max): %.3f/%.3f/%.3f"%( 
+				len(seconds), np.min(seconds), np.mean(seconds), np.max(seconds) ) )
+
+	# Simulate a chunk of events of a field. Returns (field index, chunk index, 
+	# result, seconds).
+	def simulate_chunk(self, field, index, chunk, events):
+
+		# Confirmation
+		print("Simulating: %s (chunk %d)"%(field, chunk))
+
+		start = time.perf_counter()
+
+		# Initialize monte carlo simulation (chunks always accumulate statistics)
+		Simulation = scatteringMonteCarlo( dict( self.field_config( field, (index, chunk), events, ["bands", "batch"] ), 
+			statistics = True, warmup = self.config["warmup"] if "warmup" in self.config else chunkWarmup ) )
+		Simulation.randomizeInitial()
+
+		# Run simulation
+		Simulation.run()
+
+		return index, chunk, Simulation.result, time.perf_counter() - start
+
+	# Collect a chunk. When all chunks of a field have returned, the chunk statistics
+	# are merged and logged as the field result.
+	def log_chunk(self, chunk_result):
+
+		index, chunk, result, seconds = chunk_result
+
+		self.chunks[index][chunk] = ( result, seconds )
+		self.timings.append( {"field" : result["field"], "chunk" : chunk, "events" : result["events"], "seconds" : seconds} )
+
+		if any( [ _c is None for _c in self.chunks[index] ] ):
+
+			return
+
+		chunks = self.chunks.pop(index)
+
+		# Merge chunk statistics
+		merged = trajectoryStatistics( valleys = chunks[0][0].valleys, batch = chunks[0][0].batch )
+
+		for _result, _seconds in chunks:
+
+			merged.merge(_result)
+
+		# Chunks are independent, such that each chunk is a batch for standard errors
+		merged.batches = [ ( _result.time, _result.integral["velocity"], _result.integral["energy"] ) for _result, _seconds in chunks ]
+
+		merged["field"]  = result["field"]
+		merged["random"] = [ _result["random"] for _result, _seconds in chunks ]
+		merged["chunks"] = [ ( _j, _result["events"], _seconds ) for _j, ( _result, _seconds ) in enumerate(chunks) ]
+
+		# Fraction of self scattering events (event weighted)
+		merged["selfScattering"] = sum( [ _result["selfScattering"] * _result["events"] for _result, _seconds in chunks ] ) / merged.events
+
+		self.log_result(merged)
+
+	# Simulate all fields in a single ensemble carrying a field axis. Scattering 
+	# rates are calculated once and shared by all fields. Results are stored per 
+	# field as in run. With "statistics", each field result is a trajectoryStatistics
+	# object, otherwise it holds trajectory arrays of shape (events, electrons).
+	def run_ensemble(self):
+
 		# Generate configuration dictionary
 		config = {
 			"material"	: self.config["material"],
 			"energy"	: self.config["energy"],
 			"events"	: self.config["events"],
-			"field"		: field
+			"electrons"	: self.config["electrons"],
+			"field"		: self.config["field"],
+			"seed"		: self.config["seed"],
+			"stream"	: ()
 		}
 
-		# Initialize monte carlo simulation
-		Simulation = scatteringMonteCarlo(config)
+		# Optional simulation settings
+		for key in ["warmup", "interpolate", "alias", "bands", "statistics", "cache"]:
+
+			if key in self.config: 
+
+				config[key] = self.config[key]
+
+		# Initialize ensemble monte carlo simulation
+		Simulation = ensembleMonteCarlo(config)
 		Simulation.randomizeInitial()
 
 		# Run simulation
 		Simulation.run()
 
-		# Return simulation result
-		return Simulation.result
+		# Store results per field
+		for sim_result in Simulation.fieldResults().values():
+
+			self.log_result(sim_result)
 
 	def log_result(self, sim_result):
 		
 		self.result[ sim_result["field"] ] = sim_result
 
+		if "checkpoint" in self.config:
+
+			self.checkpoint(sim_result)
+
 
 if __name__ == "__main__":
 
@@ -99,7 +556,9 @@ if __name__ == "__main__":
 			"material"	: GaAs(),
 			"energy"	: np.linspace(0.0, 2.0, 1000),
 			"field"		: np.linspace(300, 2e4, 100),
-			"events"	: 100000
+			"events"	: 100000,
+			"seed"		: None,
+			"checkpoint": "./data/checkpoint/GaAs-20kV.%s"%_run
 		}
 
 
@@ -107,6 +566,6 @@ if __name__ == "__main__":
 		Simulation = velocityFieldSimulation(config)
 		Simulation.run()
 
-		# Serialize the simulation results for post processing
+		# Store the simulation results for post processing (columnar store)
 		path = "./data/simulation/GaAs-20kV.%s"%_run
-		p.dump( {"config": config, "Simulation.result" : Simulation.result } , open(path, "wb") )
+		writeSimulation( path, config, Simulation.result )
@@ -26,11 +26,9 @@
 
 #!/usr/bin/env python
 import numpy as np
-import pickle as p
 
 # Import python utils
 import collections
-import itertools
 
 # Import matplotlib
 import matplotlib.pyplot as plt
@@ -45,8 +43,66 @@ from physicsUtilities.solidstate.materialConstants import GaAs
 
 # Import utilites
 from physicsUtilities.utilities.curveUtilities import smooth
-from physicsUtilities.utilities.curveUtilities import histogram_curve
+from physicsUtilities.utilities.curveUtilities import streamingHistogram
 
+# Import async factory (multiprocessing)
+from physicsUtilities.utilities.asyncFactory import asyncFactory
+
+# Import columnar result store
+from velocityFieldStore import loadSimulation
+
+# Method to return the flight duration started by each state of a trajectory. The
+# last state starts no recorded flight and has zero weight. Trajectories of an 
+# ensemble (shape (events, electrons)) are differenced along the event axis. 
+def flightWeights(result):
+
+	time = np.asarray( result["time"], dtype=np.float64 )
+
+	# Ensemble results in a columnar store are stored flattened
+	if "shape" in result:
+
+		time = np.reshape( time, result["shape"] )
+
+	weights = np.zeros( time.shape )
+	weights[:-1] = np.diff( time, axis = 0 )
+
+	return weights
+
+# Method to histogram the data of a simulation datafile. Returns the number of 
+# events and a partial histogram {field : {data_key : streamingHistogram}} for 
+# the closest simulated field to each field. If weighted, events are weighted 
+# by the duration of the flight they start, i.e. the time to the next event (time 
+# averaged distributions, see flightWeights).
+def histogramSimulation(path, fields, data_keys, bins = 1024, weighted = False):
+
+	# Processing path
+	print("Processing path: %s"%path)
+
+	data = loadSimulation( path )
+
+	histograms = {}
+
+	# For each field we want to have statistics for
+	for _f in fields:
+
+		# Look for closet field in simulation data
+		index = np.argmax( np.asarray( data["config"]["field"] ) >= _f )
+
+		# Extract field from configuration
+		field = data["config"]["field"][index]
+
+		result = data["Simulation.result"][field]
+
+		weights = flightWeights( result ) if weighted else None
+
+		histograms[_f] = {}
+
+		for data_key in data_keys:
+
+			histograms[_f][data_key] = streamingHistogram( bins )
+			histograms[_f][data_key].add( result[data_key], weights )
+
+	return data["config"]["events"], histograms
 
 # Script to extract statistics from data files
 if __name__ == "__main__":
@@ -64,35 +120,32 @@ if __name__ == "__main__":
 	# list of keys of plot
 	data_keys = ["velocity", "energy"]
 
-	# List of fields we want to examine statistics for
-	statistics = collections.OrderedDict( {_f : { _ : [] for _ in data_keys } for _f in fields } )
+	# List of fields we want to examine statistics for. Each datafile contributes 
+	# a partial histogram which is merged into statistics.
+	statistics = collections.OrderedDict( {_f : { _ : streamingHistogram(1024) for _ in data_keys } for _f in fields } )
 		
 	# Track the total number of simulaton events
-	events = 0
+	events = [0]
 
-	for _path in paths:
+	def log_result(result):
 
-		# Processing path
-		print("Processing path: %s"%_path)
+		events[0] += result[0]
 
-		data = p.load( open( _path, "rb" ) )
+		for _f, histograms in result[1].items():
 
-		# Events 
-		events += data["config"]["events"]
+			for data_key, histogram in histograms.items():
 
-		# For each field we want to have statistics for
-		for _f in statistics.keys():
+				statistics[_f][data_key].merge( histogram )
 
-			for data_key in data_keys:
+	factory = asyncFactory()
+
+	for _path in paths:
 
-				# Look for closet field in simulation data
-				index = np.argmax( data["config"]["field"]  >= _f )
+		factory.call(histogramSimulation, log_result, _path, fields, data_keys)
 
-				# Extract field from configuration
-				field = data["config"]["field"][index]	
+	factory.wait()
 
-				# Extract data from simulation (safe concatenate)
-				statistics[_f][data_key] = [_ for _ in itertools.chain( statistics[_f][data_key], data["Simulation.result"][field][data_key]) ]
+	events = events[0]
 
 
 	# Plot the data	(velocity)
@@ -104,7 +157,7 @@ if __name__ == "__main__":
 	hlist = []
 	for _f in statistics.keys():
 
-		bins, hist = histogram_curve( statistics[_f]["velocity"] , bins=300, normed=False )
+		bins, hist = statistics[_f]["velocity"].curve()
 
 		h, = ax0.plot(bins, smooth(hist, _smooth) )
 
@@ -122,7 +175,7 @@ if __name__ == "__main__":
 	hlist = []
 	for _f in statistics.keys():
 
-		bins, hist = histogram_curve( statistics[_f]["energy"] , bins=300, normed=False )
+		bins, hist = statistics[_f]["energy"].curve()
 
 		h, = ax0.plot(bins, smooth(hist, _smooth) )
 
@@ -0,0 +1,337 @@
+# ---------------------------------------------------------------------------------
+# 	physicsSimulations/velocityField -> velocityFieldStore.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import pickle as p
+
+# Import columnar store
+from physicsUtilities.utilities.columnarStore import columnarWriter
+from physicsUtilities.utilities.columnarStore import columnarReader
+
+# Import running statistics container
+from physicsUtilities.scattering.trajectoryStatistics import trajectoryStatistics
+
+# Routines to store velocity field simulation results in a columnar store (see
+# physicsUtilities.utilities.columnarStore) instead of pickles. Each field is a
+# group (field_0000, field_0001 ...) with columns
+#
+#	time 		: float64, delta encoded
+#	valley 		: uint8 valley codes (names in the "valleys" attribute)
+#	energy 		: float32 (precision)
+#	velocity 	: float32 (precision)
+#
+# Statistics only results (trajectoryStatistics) have no columns. Their averages,
+# dwell times and metadata are stored as group attributes, and their accumulator 
+# state (sums, integrals, batches) in the "state" attribute, such that they are 
+# restored as trajectoryStatistics objects on load (see loadField).
+
+# Columns of trajectory results
+trajectoryColumns = ["time", "valley", "energy", "velocity"]
+
+# Method to write a single field result (trajectoryResult, trajectoryStatistics
+# or dictionary of arrays/lists) into group name
+def writeField(writer, name, result, precision = np.float32):
+
+	keys = list( result.keys() )
+
+	# Statistics only results
+	if not any( [ _k in trajectoryColumns and np.ndim( result[_k] ) > 0 for _k in keys ] ):
+
+		attrs = dict( result.items() )
+
+		if hasattr(result, "integralsq"):
+
+			attrs["state"] = {
+				"valleys"	: list( result.valleys ),
+				"batch"		: result.batch,
+				"events"	: result.events,
+				"time"		: result.time,
+				"dwell"		: list( result.dwell ),
+				"sum"		: result.sum,
+				"sumsq"		: result.sumsq,
+				"integral"	: result.integral,
+				"integralsq": result.integralsq,
+				"batches"	: [ list(_b) for _b in result.batches ],
+				"closed"	: list( result.closed )
+			}
+
+		writer.group( name, attrs )
+
+		return
+
+	# Valley codes and names (trajectoryResult or columnarGroup)
+	if hasattr(result, "valleyCodes"):
+
+		valleys = list( result.valleys ) if hasattr(result, "valleys") else list( result["valleys"] )
+		codes 	= result.valleyCodes()
+
+	else:
+
+		valley = np.asarray( result["valley"] )
+
+		if valley.dtype.kind in "iu":
+
+			valleys, codes = list( result["valleys"] ), valley
+
+		else:
+
+			valleys = list( dict.fromkeys( ["G", "L"] + np.unique(valley).tolist() ) )
+			codes 	= np.zeros( valley.shape, dtype=np.uint8 )
+
+			for _i, _v in enumerate(valleys):
+
+				codes[ valley == _v ] = _i
+
+	# Attributes (metadata)
+	attrs = { _k : result[_k] for _k in keys if _k not in trajectoryColumns + ["valleys"] }
+	attrs["valleys"] = valleys
+
+	# Multidimensional results (ensemble) are stored flattened
+	if np.ndim( result["time"] ) > 1:
+
+		attrs["shape"] = list( np.shape( result["time"] ) )
+
+	writer.group( name, attrs )
+
+	writer.write( name, "time", np.ravel( result["time"] ), np.float64, "delta" )
+	writer.write( name, "valley", np.ravel( codes ), np.uint8 )
+	writer.write( name, "energy", np.ravel( result["energy"] ), precision )
+	writer.write( name, "velocity", np.ravel( result["velocity"] ), precision )
+
+# Method to write a simulation (config and result dictionary keyed by field)
+def writeSimulation(path, config, result, precision = np.float32, compress = False):
+
+	writer = columnarWriter( path, config, compress )
+
+	for _i, _f in enumerate( config["field"] ):
+
+		writeField( writer, "field_%04d"%_i, result[_f], precision )
+		writer.group( "field_%04d"%_i, {"field" : _f} )
+
+	writer.close()
+
+# Method to load a simulation. Returns a dictionary with the same layout as the
+# pickled simulation data {"config", "Simulation.result"}, with result groups keyed
+# by field. Columns are read on access. Pickled simulations are loaded as is.
+def loadSimulation(path):
+
+	if os.path.isfile(path):
+
+		return p.load( open( path, "rb" ) )
+
+	reader = columnarReader(path)
+
+	result = { reader[_g]["field"] : loadField( reader, _g ) for _g in reader.groups() }
+
+	return {"config" : reader.config, "Simulation.result" : result}
+
+# Method to load a field result. Statistics only results with accumulator state 
+# are restored as trajectoryStatistics objects, other results are returned as groups.
+def loadField(reader, name):
+
+	group = reader[name]
+
+	if "state" not in group.attrs:
+
+		return group
+
+	state, keys = group["state"], ["energy", "velocity"]
+
+	result = trajectoryStatistics( valleys = state["valleys"], batch = state["batch"] )
+
+	result.accumulate( state["events"], state["time"], state["dwell"], 
+		[ state["sum"][_k] for _k in keys ], [ state["sumsq"][_k] for _k in keys ], 
+		[ state["integral"][_k] for _k in keys ], [ state["integralsq"][_k] for _k in keys ], 
+		state["batches"] )
+
+	result.closed = tuple( state["closed"] )
+
+	# Metadata
+	for key, value in group.attrs.items():
+
+		if key not in ["energy", "velocity", "valley", "events", "time", "state"]:
+
+			result[key] = value
+
+	return result
+
+# Checkpoints of a velocity field simulation. A checkpoint directory holds one 
+# columnar store per finished field (field_0000, field_0001 ...) and a manifest
+#
+#	{"seed" : ..., "field" : [...], "events" : ..., "settings" : ..., 
+#		"fields" : {name : {"field", "index", "streams"}}}
+#
+# recording the master seed, a digest of the simulation settings and the random 
+# number streams (spawn keys) of each finished field. Stores and manifest are written to temporary paths and moved 
+# into place, such that an interrupted write never leaves a partial checkpoint.
+manifestName = "manifest.json"
+
+# Method to load a checkpoint manifest (None if there is no checkpoint)
+def loadManifest(path):
+
+	if not os.path.exists( os.path.join(path, manifestName) ):
+
+		return None
+
+	with open( os.path.join(path, manifestName), "r" ) as f:
+
+		return json.load(f)
+
+# Method to write a checkpoint manifest
+def writeManifest(path, manifest):
+
+	os.makedirs(path, exist_ok = True)
+
+	with open( os.path.join(path, manifestName + ".tmp"), "w" ) as f:
+
+		json.dump( manifest, f, indent = 1 )
+
+	os.replace( os.path.join(path, manifestName + ".tmp"), os.path.join(path, manifestName) )
+
+# Method to write a field result to a checkpoint. Returns the stored group.
+def writeCheckpoint(path, name, result, precision = np.float32):
+
+	store, tmp = os.path.join(path, name), os.path.join(path, name + ".tmp")
+
+	for _path in [store, tmp]:
+
+		if os.path.exists(_path):
+
+			shutil.rmtree(_path)
+
+	writer = columnarWriter( tmp )
+	writeField( writer, name, result, precision )
+	writer.close()
+
+	os.replace( tmp, store )
+
+	return loadCheckpoint( path, name )
+
+# Method to load a field result from a checkpoint
+def loadCheckpoint(path, name):
+
+	return loadField( columnarReader( os.path.join(path, name) ), name )
+
+# Method to write postprocessed data {"composite", "data"} (see velocityFieldPostprocess)
+def writePostprocess(path, data, compress = False):
+
+	writer = columnarWriter( path, {}, compress )
+
+	for name, _data, attrs in [ ("composite", data["composite"], {}) ] + \
+		[ ("data_%04d"%_i, data["data"][_k], {"path" : _k}) for _i, _k in enumerate( data["data"].keys() ) ]:
+
+		writer.group( name, dict( attrs, events = _data["events"], valleys = list( _data["valley"].keys() ) ) )
+
+		# Event moments of postprocessed runs (see velocityFieldPostprocess)
+		if "moments" in _data:
+
+			writer.group( name, {"moments" : _data["moments"]} )
+
+		for column in ["field", "energy", "velocity"]:
+
+			writer.write( name, column, _data[column], np.float64 )
+
+		for valley, dwell in _data["valley"].items():
+
+			writer.write( name, "valley_%s"%valley, dwell, np.float64 )
+
+	writer.close()
+
+# Method to load postprocessed data. Returns {"composite", "data"} as written by
+# velocityFieldPostprocess. Pickled files are loaded as is.
+def loadPostprocess(path):
+
+	if os.path.isfile(path):
+
+		return p.load( open( path, "rb" ) )
+
+	reader = columnarReader(path)
+
+	def load(group):
+
+		data = {
+			"field"		: np.array( group["field"] ),
+			"energy"	: np.array( group["energy"] ),
+			"velocity"	: np.array( group["velocity"] ),
+			"valley"	: { _v : np.array( group[ "valley_%s"%_v ] ) for _v in group["valleys"] },
+			"events"	: group["events"]
+		}
+
+		if "moments" in group:
+
+			data["moments"] = group["moments"]
+
+		return data
+
+	data = { reader[_g]["path"] : load( reader[_g] ) for _g in reader.groups() if _g != "composite" }
+
+	return {"composite" : load( reader["composite"] ), "data" : data}
+
+# Method to convert a pickled simulation {"config", "Simulation.result"}
+def convertSimulation(source, path, precision = np.float32, compress = False):
+
+	data = p.load( open( source, "rb" ) )
+
+	writeSimulation( path, data["config"], data["Simulation.result"], precision, compress )
+
+# Method to convert a pickled postprocess file (.dat)
+def convertPostprocess(source, path, compress = False):
+
+	writePostprocess( path, p.load( open( source, "rb" ) ), compress )
+
+# Convert pickled simulation and postprocess files to columnar stores. Stores are
+# written next to the pickles with suffix ".col". Usage:
+#
+#	python velocityFieldStore.py [files ...]
+#
+if __name__ == "__main__":
+
+	# Files to convert (default: all data files)
+	if len(sys.argv) > 1:
+
+		paths = sys.argv[1:]
+
+	else:
+
+		paths = [ os.path.join(_d, _f) for _d in ["./data/simulation", "./data/postprocess"]
+			if os.path.isdir(_d) for _f in sorted( os.listdir(_d) ) if not _f.endswith(".col") ]
+
+	for _path in paths:
+
+		print("Converting: %s"%_path)
+
+		if _path.endswith(".dat"):
+
+			convertPostprocess( _path, _path + ".col" )
+
+		else:
+
+			convertSimulation( _path, _path + ".col" )
@@ -0,0 +1,129 @@
+# ---------------------------------------------------------------------------------
+# 	physicsSimulations/velocityField -> velocityTemperatureSimulation.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import pickle as p
+
+# Import physical and material constants
+from physicsUtilities.solidstate.materialConstants import GaAs
+
+# Import scattering rates
+from physicsUtilities.solidstate.materialScatteringRates import materialScatteringRates
+
+# Import ensemble Monte Carlo simulation
+from physicsUtilities.scattering.ensembleMonteCarlo import ensembleMonteCarlo
+
+# Simulate electron velocity vs. electric field for a list of temperatures. Scattering 
+# rates are calculated once and rescaled to each temperature (see 
+# materialScatteringRates.atTemperature). For each temperature, all fields are 
+# simulated in a single ensemble carrying a field axis.
+class velocityTemperatureSimulation:
+
+	def __init__(self, config):
+
+		# Configuration data
+		self.config = config
+
+		# Master seed for random number streams. If no seed is given we draw one 
+		# and store it in the configuration such that any temperature can be replayed.
+		if "seed" not in self.config or self.config["seed"] is None:
+
+			self.config["seed"] = np.random.SeedSequence().entropy
+
+		# Dictionary to store simulation results: result[T][field]
+		self.result = {}
+
+	# Simulation run method 
+	def run(self):
+
+		# Scattering rates at the material temperature
+		rates = materialScatteringRates( self.config["energy"], self.config["material"], 
+			cache = self.config["cache"] if "cache" in self.config else None )
+
+		for _i, _T in enumerate(self.config["temperature"]):
+
+			self.result[_T] = self.simulate_temperature( rates.atTemperature(_T), _i )
+
+	# Simulate all fields at one temperature. Each temperature draws from its own 
+	# random number stream (spawn key = temperature index).
+	def simulate_temperature(self, rates, index):
+
+		# Confirmation
+		print("Simulating: %sK"%rates.material.T)
+
+		# Generate configuration dictionary
+		config = {
+			"material"	: rates.material,
+			"energy"	: self.config["energy"],
+			"events"	: self.config["events"],
+			"electrons"	: self.config["electrons"],
+			"field"		: self.config["field"],
+			"rates"		: rates,
+			"seed"		: self.config["seed"],
+			"stream"	: (index, ),
+			"statistics": True
+		}
+
+		# Optional simulation settings
+		for key in ["warmup", "interpolate", "alias", "bands"]:
+
+			if key in self.config: 
+
+				config[key] = self.config[key]
+
+		# Initialize ensemble monte carlo simulation
+		Simulation = ensembleMonteCarlo(config)
+		Simulation.randomizeInitial()
+
+		# Run simulation
+		Simulation.run()
+
+		# Return results per field
+		return Simulation.fieldResults()
+
+
+if __name__ == "__main__":
+
+	# Generate configuration dictionary for simulation
+	config = {
+		"material"		: GaAs(),
+		"energy"		: np.linspace(0.0, 2.0, 1000),
+		"field"			: np.linspace(300, 2e4, 50),
+		"temperature"	: np.linspace(77, 500, 20),
+		"events"		: 2000,
+		"electrons"		: 500,
+		"warmup"		: 500,
+		"seed"			: None
+	}
+
+	# Initialize simulation
+	Simulation = velocityTemperatureSimulation(config)
+	Simulation.run()
+
+	# Serialize the simulation results for post processing
+	path = "./data/simulation/GaAs-temperature"
+	p.dump( {"config": config, "Simulation.result" : Simulation.result } , open(path, "wb") )
@@ -0,0 +1,540 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/scattering -> ensembleMonteCarlo.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Import random number streams
+from ..utilities.randomStream import randomStream
+
+# Import scattering rates object
+from ..solidstate.materialScatteringRates import materialScatteringRates
+
+# Import simulation local utilities
+from .scatteringEventProcessor import scatteringEventProcessor
+from .trajectoryStatistics import trajectoryStatistics
+from .trajectoryStatistics import integrateFlight
+
+# A class to simulate an ensemble of electrons with intervalley scattering via
+# Monte Carlo methods. The state of the ensemble (kz, kr, E, valley) is held in
+# numpy arrays and all electrons are advanced through one flight and one scattering
+# event per step. Each electron is statistically equivalent to the single particle
+# in scatteringMonteCarlo, so that averages over the ensemble reproduce the single
+# particle averages.
+#
+# The ensemble carries a field axis: if "field" is an array of F fields, the
+# ensemble holds F x electrons electrons (electrons per field) which are stepped
+# together against the same scattering rate tables. A whole velocity-field curve 
+# is thus simulated in one ensemble (see fieldResults).
+#
+#	config = {
+#		"material"	: material constants object (e.g. GaAs)
+#		"energy"	: energy grid for scattering rates (eV)
+#		"field"		: electric field (V/cm) or array of electric fields
+#		"events"	: number of recorded events per electron
+#		"electrons"	: number of electrons in the ensemble (per field)
+#		"warmup"	: (optional) number of unrecorded steps to relax the ensemble
+#		"interpolate"	: (optional) interpolate scattering matrices between energies
+#		"alias"		: (optional) select scattering events from alias tables
+#		"seed"		: (optional) master seed of random number stream
+#		"stream"	: (optional) spawn key of random number stream
+#		"bands"		: (optional) energy bands for variable Gamma scheme (requires
+#					  "statistics", as events are not uniform in time)
+#		"rates"		: (optional) prebuilt materialScatteringRates object
+#		"cache"		: (optional) on-disk cache directory for scattering rates
+#		"statistics"	: (optional) accumulate running statistics per electron
+#					  instead of storing the trajectories (see trajectoryStatistics)
+#	}
+#
+class ensembleMonteCarlo:
+
+	def __init__(self, config):
+
+		# Random number generator
+		self.random = randomStream( 
+			config["seed"] if "seed" in config else None,
+			config["stream"] if "stream" in config else ()
+		)
+
+		# Store sinulation configuration data
+		self.material  = config["material"]
+		self.energy    = config["energy"]
+		self.field	   = config["field"]
+		self.events    = config["events"]
+		self.electrons = config["electrons"]
+		self.warmup    = config["warmup"] if "warmup" in config else 0
+		self.statistics = config["statistics"] if "statistics" in config else False
+		interpolate    = config["interpolate"] if "interpolate" in config else False
+		alias 		   = config["alias"] if "alias" in config else False
+
+		# Event averages of a variable Gamma trajectory are biased
+		if "bands" in config and config["bands"] is not None and not self.statistics:
+
+			raise ValueError("ensembleMonteCarlo: \"bands\" (variable Gamma) requires \"statistics\"")
+
+		# Calculate scattering rates for phonon processes
+		self.rates = config["rates"] if "rates" in config else materialScatteringRates( self.energy, self.material, 
+			cache = config["cache"] if "cache" in config else None )
+
+		# Build scattering event processor for calculated rates. We reuse its
+		# scattering matrices and maximum scattering rates.
+		self.Processor = scatteringEventProcessor( self.rates, interpolate, alias, self.random, 
+			config["bands"] if "bands" in config else None )
+
+		# Build ensemble lookup tables
+		self.buildEnsembleTables()
+
+		# Field axis: electrons are ordered by field, such that electrons of field
+		# index f are [f * electrons, (f + 1) * electrons). Each electron carries 
+		# the field under which it is accelerated.
+		self.fields = np.atleast_1d( np.asarray( self.field, dtype=float ) )
+		self.size 	= len(self.fields) * int(self.electrons)
+		self.F 		= np.repeat( self.fields, int(self.electrons) )
+
+		# Initialize ensemble state. Valleys are stored as integer codes
+		# which index into self.valleys
+		self.kz 	= np.zeros( self.size )
+		self.kr 	= np.zeros( self.size )
+		self.E 		= np.zeros( self.size )
+		self.v 		= np.zeros( self.size )
+		self.time 	= np.zeros( self.size )
+		self.valley = np.zeros( self.size, dtype=np.uint8 )
+
+		# Count real and self scattering events
+		self.scatteringCount = {"real" : 0, "self" : 0}
+
+	# Method to build valley and process tables indexed by integer valley codes
+	def buildEnsembleTables(self):
+
+		# Valley codes
+		self.valleys = list( self.Processor.valleys )
+
+		# Kinematic constants of each valley (see materialKinematics)
+		kinematics = self.Processor.kinematics
+
+		self.mass 	 = np.array( kinematics.mass )
+		self.kfactor = np.array( kinematics.kfactor )
+		self.hbarm 	 = np.array( kinematics.hbarm )
+		self.c 		 = np.array( kinematics.c )
+
+		# Maximum scattering rate in each band for each valley
+		self.Gamma = np.array( [ self.Processor.bandCeilings[_v] for _v in self.valleys ] )
+
+		# Scattering matrices have a different number of rows in each valley. Pad
+		# with ones so that they can be stacked (valley, row, energy). Rows of ones
+		# are never selected as they follow the self scattering row.
+		rows = max( [ self.Processor.scatteringMatrices[_v].shape[0] for _v in self.valleys ] )
+
+		self.scatteringMatrices = np.ones( ( len(self.valleys), rows, len(self.energy) ) )
+
+		# Process tables: change in energy, final valley and symmetry of each row
+		# 	sym = 0 (self scattering), 1 (isotropic), 2 (anisotropic)
+		self.dE  = np.zeros( ( len(self.valleys), rows ) )
+		self.Vf  = np.zeros( ( len(self.valleys), rows ), dtype=np.uint8 )
+		self.sym = np.zeros( ( len(self.valleys), rows ), dtype=np.uint8 )
+
+		for _i, _v in enumerate(self.valleys):
+
+			# Copy scattering matrix into stack
+			_mat = self.Processor.scatteringMatrices[_v]
+			self.scatteringMatrices[ _i, :_mat.shape[0], : ] = _mat
+
+			# Self scattering rows keep the initial valley
+			self.Vf[_i, :] = _i
+
+			# Process metadata arrays (last index is self scattering)
+			dE, Vf, sym = self.rates.processArrays( _v, self.valleys )
+
+			self.dE[_i, :len(dE)]  = dE
+			self.Vf[_i, :len(Vf)]  = Vf
+			self.sym[_i, :len(sym)] = sym
+
+		# Stack alias tables (valley, slot, energy). Padded slots are never thrown 
+		# as slots are thrown on the number of events in each valley.
+		if self.Processor.alias:
+
+			self.slots = np.zeros( len(self.valleys), dtype=int )
+			self.prob  = np.ones( ( len(self.valleys), rows - 1, len(self.energy) ) )
+			self.alias = np.zeros( ( len(self.valleys), rows - 1, len(self.energy) ), dtype=int )
+
+			for _i, _v in enumerate(self.valleys):
+
+				_prob, _alias = self.Processor.aliasTables[_v]
+
+				self.slots[_i] = _prob.shape[0]
+				self.prob[ _i, :_prob.shape[0], : ]   = _prob
+				self.alias[ _i, :_alias.shape[0], : ] = _alias
+
+	# Method to extract the scattering matrix columns for the ensemble (electrons, rows)
+	def scatteringColumns(self):
+
+		if not self.Processor.index.interpolate:
+
+			return self.scatteringMatrices[ self.valley, :, self.Processor.index.nearest(self.E) ]
+
+		col, w = self.Processor.index.bracket(self.E)
+
+		return ( ( 1.0 - w )[:, np.newaxis] * self.scatteringMatrices[ self.valley, :, col ] + 
+			w[:, np.newaxis] * self.scatteringMatrices[ self.valley, :, col + 1 ] )
+
+	# Method to return magnitude of wavevector for ensemble energies in valleys (codes)
+	def magK(self, codes, Ef):
+
+		return self.kfactor[codes] * np.sqrt( np.maximum(Ef, 0.0) )
+
+	# Method to update ensemble energy and velocity from the current wavevectors
+	def updateEnsemble(self):
+
+		self.E = self.c[self.valley] * ( self.kz**2 + self.kr**2 )
+		self.v = self.hbarm[self.valley] * self.kz
+
+	# This method will randomize the initial state of the ensemble
+	def randomizeInitial(self, Emax = 0.05):
+
+		r = self.random.random( self.size )
+
+		# All electrons start in the lowest valley
+		self.valley[:] = 0
+		self.time[:]   = 0.0
+
+		# Isotropic scattering event into energy Emax*r
+		self.isotropicScatteringEvent( np.ones(self.size, dtype=bool), Emax * r, self.valley.copy() )
+		self.updateEnsemble()
+
+		# Simulation metadata
+		self.result = {
+			"field"		: self.field,
+			"valleys"	: self.valleys,
+			"random"	: self.random.describe()
+		}
+
+		# Running statistics per electron
+		if self.statistics:
+
+			self.resetAccumulators()
+			return
+
+		# Arrays to store results (events, electrons)
+		for key, dtype in [("time", float), ("valley", np.uint8), ("energy", float), ("velocity", float)]:
+
+			self.result[key] = np.zeros( ( self.events, self.size ), dtype=dtype )
+
+		self.recordEnsemble(0)
+
+	# Method to reset the per electron accumulators of the statistics mode. Flight 
+	# integrals (time, v, v^2, E, E^2), dwell times (valley, electron) and event sums 
+	# (events, v, v^2, E, E^2) are accumulated for each electron.
+	def resetAccumulators(self):
+
+		self.accumulators = {
+			"time"		: np.zeros( self.size ),
+			"dwell"		: np.zeros( ( len(self.valleys), self.size ) ),
+			"integral"	: np.zeros( ( 4, self.size ) ),
+			"events"	: np.zeros( self.size, dtype=int ),
+			"sum"		: np.zeros( ( 4, self.size ) ),
+		}
+
+	# Method to accumulate a flight (tau) and the following event of each electron. 
+	# Initial energy, velocity and valley of the flight are given, and the current 
+	# state is the state after scattering.
+	def accumulateEnsemble(self, tau, code, E0, v0, v1):
+
+		v, v2, E, E2 = integrateFlight( tau, self.mass[code], E0, v0, v1 )
+
+		self.accumulators["time"] += tau
+		self.accumulators["dwell"][ code, np.arange(self.size) ] += tau
+		self.accumulators["integral"] += ( v, v2, E, E2 )
+
+		self.accumulators["events"] += 1
+		self.accumulators["sum"] += ( self.v, self.v**2, self.E, self.E**2 )
+
+	# Method to store ensemble state in result arrays
+	def recordEnsemble(self, event):
+
+		self.result["time"][event, :]		= self.time
+		self.result["valley"][event, :]		= self.valley
+		self.result["energy"][event, :]		= self.E
+		self.result["velocity"][event, :]	= self.v
+
+	# Method to generate flight times for the ensemble. Flights are generated with the
+	# maximum scattering rate of the current band and truncated at band edges as in
+	# scatteringEventProcessor.generateBandFlightTime. With a single band, all flights
+	# are generated in one pass.
+	def generateFlightTime(self):
+
+		# Rate of change of axial wavevector and energy scale: E = c |K|^2
+		a = -self.F / self.material.hbar
+		c = self.c[self.valley]
+
+		# Band of current electron energy
+		band = self.Processor.columnBand[ self.Processor.index.nearest(self.E) ]
+
+		# Follow electrons through bands
+		kz 	   = self.kz.copy()
+		tau    = np.zeros( self.size )
+		active = np.arange( self.size )
+
+		while len(active) > 0:
+
+			# Throw on (0, 1] to protect the logarithm
+			r = 1.0 - self.random.random( len(active) )
+			t = ( -1.0 / self.Gamma[ self.valley[active], band[active] ] ) * np.log(r)
+
+			# Time to leave current band
+			tc, step = self.Processor.bandCrossing( kz[active], self.kr[active], c[active], a[active], band[active] )
+
+			# Completed flights
+			done = t < tc
+			tau[ active[done] ] += t[done]
+
+			# Move remaining electrons to band edge 
+			active, tc, step = active[~done], tc[~done], step[~done]
+
+			tau[active]  += tc
+			kz[active]   += a[active] * tc
+			band[active] += step
+
+		return tau
+
+	# Apply electric field to ensemble for simulated flight times (tau)
+	def applyElectricField(self):
+
+		# Generate flight times
+		tau = self.generateFlightTime()
+
+		self.time += tau
+
+		# For free acceleration in an electric field all energy goes
+		# into axial component.
+		self.kz += ( -self.F * tau ) / self.material.hbar
+
+		# Update ensemble state
+		self.updateEnsemble()
+
+		# Return flight times
+		return tau
+
+	# Method to select scattering event indices for the ensemble
+	def selectScatteringEvent(self):
+
+		# Constant time selection from alias tables
+		if self.Processor.alias:
+
+			col  = self.Processor.index.nearest(self.E)
+
+			# Throw slots on interval [0, K) and random numbers on [0, 1]
+			slot = ( self.random.random( self.size ) * self.slots[self.valley] ).astype(int)
+			r 	 = self.random.random( self.size )
+
+			return np.where( r < self.prob[self.valley, slot, col], slot, self.alias[self.valley, slot, col] )
+
+		# Extract the scattering matrix columns for each electron (electrons, rows)
+		R = self.scatteringColumns()
+
+		# Throw random numbers on interval [0, 1] and find the scattering events
+		r = self.random.random( self.size )
+
+		return np.argmax( R > r[:, np.newaxis], axis = 1 ) - 1
+
+	# Method to generate scattering events for the whole ensemble
+	def generateScatteringEvent(self):
+
+		# Find the index of scattering events
+		index = self.selectScatteringEvent()
+
+		# Lookup process tables
+		dE  = self.dE[self.valley, index]
+		Vf  = self.Vf[self.valley, index]
+		sym = self.sym[self.valley, index]
+
+		# Count real and self scattering events
+		self.scatteringCount["self"] += int( np.count_nonzero( sym == 0 ) )
+		self.scatteringCount["real"] += int( np.count_nonzero( sym != 0 ) )
+
+		# Update electrons which have undergone a real scattering event
+		self.anisotropicScatteringEvent( sym == 2, dE, Vf )
+		self.isotropicScatteringEvent( sym == 1, dE, Vf )
+
+	# Isotropic scattering events for electrons selected by mask
+	def isotropicScatteringEvent(self, mask, dE, Vf):
+
+		n = np.count_nonzero(mask)
+
+		if n == 0:
+
+			return
+
+		# Throw random numbers on interval [0, 1]
+		r = self.random.random( n )
+
+		# Calculate the energy after scattering
+		Ef = np.maximum( self.E[mask] + dE[mask], 0.0 )
+		K  = self.magK( Vf[mask], Ef )
+
+		# Wavevector oriented randomly on the interval [0, 2pi]
+		self.kz[mask] = K * np.cos( 2.0 * np.pi * r )
+		self.kr[mask] = K * np.sin( 2.0 * np.pi * r )
+
+		# Update valley occupancy
+		self.valley[mask] = Vf[mask]
+
+	# Anisotropic scattering events for electrons selected by mask. The new
+	# wavevector is preferentially oriented along the original wavevector.
+	def anisotropicScatteringEvent(self, mask, dE, Vf):
+
+		n = np.count_nonzero(mask)
+
+		if n == 0:
+
+			return
+
+		# Store initial and final energies
+		Ei = self.E[mask]
+		Ef = self.E[mask] + dE[mask]
+
+		# Throw random numbers on interval [0, 1]
+		r = self.random.random( n )
+
+		# The parameter (xi) governing anisotropic scattering. Forward
+		# scattering is assumed when the transition is not allowed.
+		allowed = ( Ei > 0.0 ) & ( Ef > 0.0 )
+
+		_Ei, _Ef = np.where(allowed, Ei, 1.0), np.where(allowed, Ef, 2.0)
+
+		xi = 2.0 * np.sqrt( _Ei * _Ef ) / ( np.sqrt(_Ei) - np.sqrt(_Ef) )**2
+
+		# Calculate cos(theta) : theta scattering angle in a rotated system
+		cos_theta = np.where( allowed, ( (1 + xi) - np.power( 1.0 + 2.0 * xi, r) ) / xi, 1.0 )
+		sin_theta = np.sqrt( np.maximum( 1.0 - cos_theta**2, 0.0 ) )
+		cos_phi   = np.cos( 2.0 * np.pi * r )
+
+		# Components in unrotated coordinate system
+		Kmag 	  = np.sqrt( self.kz[mask]**2 + self.kr[mask]**2 )
+		cos_alpha = np.where( Kmag > 0.0, self.kz[mask] / np.where(Kmag > 0.0, Kmag, 1.0), 1.0 )
+		sin_alpha = np.sqrt( np.maximum( 1.0 - cos_alpha**2, 0.0 ) )
+
+		# Calculate the new k componenets
+		cos_f = np.clip( cos_alpha * cos_theta - sin_alpha * sin_theta * cos_phi, -1.0, 1.0 )
+		K 	  = self.magK( Vf[mask], Ef )
+
+		self.kz[mask] = K * cos_f
+		self.kr[mask] = K * np.sqrt( 1.0 - cos_f**2 )
+
+		# Update valley occupancy
+		self.valley[mask] = Vf[mask]
+
+	# Run the simulation
+	def run(self):
+
+		# Relax the ensemble without recording
+		for _ in range( int(self.warmup) ):
+
+			self.applyElectricField()
+			self.generateScatteringEvent()
+			self.updateEnsemble()
+
+		# Time and event counts are measured from the end of the warmup
+		self.time[:] = 0.0
+		self.scatteringCount = {"real" : 0, "self" : 0}
+
+		if self.statistics:
+
+			self.resetAccumulators()
+
+		else:
+
+			self.recordEnsemble(0)
+
+		# Interate over number of scattering events
+		for event in range( 1, int(self.events) ):
+
+			# Initial state of the flight
+			E0, v0, code = self.E, self.v, self.valley.copy()
+
+			# Apply electric field to ensemble
+			tau = self.applyElectricField()
+			v1 	= self.v
+
+			# Simulate scattering events
+			self.generateScatteringEvent()
+
+			# Update energy and velocity and store results
+			self.updateEnsemble()
+
+			if self.statistics:
+
+				self.accumulateEnsemble( tau, code, E0, v0, v1 )
+
+			else:
+
+				self.recordEnsemble(event)
+
+		# Store fraction of self scattering events
+		events = self.scatteringCount["real"] + self.scatteringCount["self"]
+
+		self.result["selfScattering"] = self.scatteringCount["self"] / events if events > 0 else 0.0
+
+	# Method to split the result along the field axis. Returns a dictionary keyed
+	# by field. In statistics mode, each field holds a trajectoryStatistics object
+	# which combines the electrons of that field. Each electron is an independent 
+	# batch, such that standard errors are estimated from the scatter between
+	# electrons. Otherwise each field holds the result arrays (events, electrons).
+	def fieldResults(self):
+
+		results = {}
+
+		for _i, _f in enumerate(self.fields):
+
+			_s = slice( _i * int(self.electrons), ( _i + 1 ) * int(self.electrons) )
+
+			if self.statistics:
+
+				acc = self.accumulators
+
+				result = trajectoryStatistics( valleys = self.valleys )
+				result.accumulate( 
+					np.sum( acc["events"][_s] ),
+					np.sum( acc["time"][_s] ),
+					np.sum( acc["dwell"][:, _s], axis = 1 ),
+					np.sum( acc["sum"][:, _s], axis = 1 )[[2, 0]],
+					np.sum( acc["sum"][:, _s], axis = 1 )[[3, 1]],
+					np.sum( acc["integral"][:, _s], axis = 1 )[[2, 0]],
+					np.sum( acc["integral"][:, _s], axis = 1 )[[3, 1]],
+					zip( acc["time"][_s], acc["integral"][0, _s], acc["integral"][2, _s] )
+				)
+
+			else:
+
+				result = { key : self.result[key][:, _s] for key in ["time", "valley", "energy", "velocity"] }
+				result["valleys"] = self.valleys
+
+			result["field"]  = _f
+			result["random"] = self.result["random"]
+			result["selfScattering"] = self.result["selfScattering"]
+
+			results[_f] = result
+
+		return results
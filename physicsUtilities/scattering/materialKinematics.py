@@ -0,0 +1,90 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/scattering -> materialKinematics.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import math
+
+# A frozen bundle of the kinematic constants of a material, built once and shared 
+# by the electron state and the scattering event processor. Per valley (indexed by 
+# valley code, i.e. index into valleys):
+#
+#	mass 	: effective mass m
+#	kfactor : sqrt(2m)/hbar, such that |K| = kfactor * sqrt(E)
+#	hbarm 	: hbar/m, such that v = hbarm * kz
+#	c 		: hbar^2/2m, such that E = c * |K|^2
+#
+# If scattering rates are given, the bundle also holds the process tables of each 
+# valley (see materialScatteringRates.processArrays) as tuples indexed by process
+#
+#	processes[code] = (dE, Vf, sym)
+#
+# with final valley codes (Vf) and symmetry codes (sym, 0 = self scattering). All 
+# values are plain python floats and ints, for fast access in scalar code.
+class materialKinematics:
+
+	__slots__ = ["valleys", "codes", "hbar", "mass", "kfactor", "hbarm", "c", "processes", "frozen"]
+
+	def __init__(self, material, valleys = ("G", "L"), rates = None):
+
+		# Valley names and codes
+		self.valleys = tuple(valleys)
+		self.codes 	 = { _v : _i for _i, _v in enumerate(self.valleys) }
+
+		# Valley parameters
+		self.hbar 	 = float(material.hbar)
+		self.mass 	 = tuple( [ float( material.effectiveMass(_v) ) for _v in self.valleys ] )
+		self.kfactor = tuple( [ math.sqrt( 2.0 * _m ) / self.hbar for _m in self.mass ] )
+		self.hbarm 	 = tuple( [ self.hbar / _m for _m in self.mass ] )
+		self.c 		 = tuple( [ self.hbar**2 / ( 2.0 * _m ) for _m in self.mass ] )
+
+		# Process tables
+		self.processes = None
+
+		if rates is not None:
+
+			self.processes = tuple( [ tuple( [ tuple( _a.tolist() ) for _a in rates.processArrays( _v, self.valleys ) ] ) 
+				for _v in self.valleys ] )
+
+		self.frozen = True
+
+	# The bundle is read only once built
+	def __setattr__(self, key, value):
+
+		if getattr(self, "frozen", False):
+
+			raise AttributeError("materialKinematics is read only: %s"%key)
+
+		object.__setattr__(self, key, value)
+
+	# Method to return magnitude of wavevector for energy E in valley (code)
+	def magK(self, code, E):
+
+		return self.kfactor[code] * math.sqrt(E) if E > 0.0 else 0.0
+
+	# Method to return energy for magnitude of wavevector K in valley (code)
+	def magE(self, code, K):
+
+		return self.c[code] * K**2
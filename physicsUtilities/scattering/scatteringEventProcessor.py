@@ -24,12 +24,15 @@
 #	SOFTWARE.
 #
 
-# Import numpy and random
+# Import numpy and math
 import numpy as np
-import random
+import math
 
-# Import physical and material constants
-from ..utilities.physicalConstants import physicalConstants
+# Import random number streams
+from ..utilities.randomStream import randomStream
+
+# Import material kinematics bundle
+from .materialKinematics import materialKinematics
 
 # A data class to hold cylindrical wavevectors
 class cylindricalWavevector:
@@ -41,35 +44,162 @@ class cylindricalWavevector:
 
 		self.mag = np.sqrt(kz**2 + kr**2)
 
-# A data class to hold the state of the electron. 
+# An index into the energy grid of the scattering rate tables. The index is built 
+# once from the energy grid and returns the column for a given electron energy in 
+# constant time. Uniform grids are binned arithmetically, non-uniform grids via a 
+# binary search. Energies outside of the grid are clamped to the first/last column.
+class energyIndex:
+
+	def __init__(self, energy, interpolate = False):
+
+		# Store energy grid
+		self.energy = np.asarray(energy, dtype=float)
+		self.size 	= len(self.energy)
+
+		# Linear interpolation between columns
+		self.interpolate = interpolate
+
+		# Check if grid is uniform
+		step = np.diff(self.energy)
+
+		self.uniform = bool( np.allclose( step, step[0], rtol=1e-9, atol=0.0 ) )
+
+		# Cache grid origin and spacing for arithmetic binning
+		self.E0 = float( self.energy[0] )
+		self.dE = float( step[0] )
+
+	# Return column of grid point nearest to energy E. Ties are resolved towards 
+	# the lower energy (as list.index(min(...)) does). Accepts scalars or arrays.
+	def nearest(self, E):
+
+		# Scalar lookup on a uniform grid (single particle path)
+		if self.uniform and np.ndim(E) == 0:
+
+			col = math.ceil( (E - self.E0) / self.dE - 0.5 )
+
+			return min( max( col, 0 ), self.size - 1 )
+
+		# Array lookup on a uniform grid
+		if self.uniform:
+
+			col = np.ceil( ( np.asarray(E) - self.E0 ) / self.dE - 0.5 ).astype(int)
+
+			return np.clip( col, 0, self.size - 1 )
+
+		# Non-uniform grid. Find upper neighbour and compare distances 
+		col = np.clip( np.searchsorted( self.energy, E ), 1, self.size - 1 )
+		col = np.where( E - self.energy[col - 1] <= self.energy[col] - E, col - 1, col )
+
+		return int(col) if np.ndim(E) == 0 else col
+
+	# Return the lower column and interpolation weight (w) such that the value
+	# at E is approximated as (1 - w) * table[col] + w * table[col + 1]
+	def bracket(self, E):
+
+		if self.uniform:
+
+			x   = ( np.asarray(E, dtype=float) - self.E0 ) / self.dE
+			col = np.clip( np.floor(x).astype(int), 0, self.size - 2 )
+
+		else:
+
+			col = np.clip( np.searchsorted( self.energy, E, side="right" ) - 1, 0, self.size - 2 )
+			x   = col + ( np.asarray(E, dtype=float) - self.energy[col] ) / ( self.energy[col + 1] - self.energy[col] )
+
+		# Clamp weight to protect energies outside of grid
+		w = np.clip( x - col, 0.0, 1.0 )
+
+		return ( int(col), float(w) ) if np.ndim(E) == 0 else ( col, w )
+
+	# Return the column(s) of table (..., energy) for energy E. Columns are either 
+	# taken from the nearest grid point or linearly interpolated.
+	def lookup(self, table, E):
+
+		if not self.interpolate:
+
+			return table[..., self.nearest(E)]
+
+		col, w = self.bracket(E)
+
+		return ( 1.0 - w ) * table[..., col] + w * table[..., col + 1]
+
+# A data class to hold the state of the electron. The state is updated in place. 
+# Valleys are stored as integer codes (index into valleys), and the valley parameters 
+# are taken from a materialKinematics bundle (built from material if not given).
 class solidStateElectron:
 
-	# Initialization method
-	def __init__(self, material, valley = "G"):
+	__slots__ = ["material", "kinematics", "valleys", "codes", "mass", "kfactor", "hbarm", "c", "code", "m", "kz", "kr", "E", "v"]
+
+	# Initialization method. The electron starts in valley (the first valley if None).
+	def __init__(self, material, valley = None, valleys = ("G", "L"), kinematics = None):
 
 		# Cache the material propertes object
 		self.material = material
-		
+
+		# Kinematic constants
+		self.kinematics = kinematics if kinematics is not None else materialKinematics( material, valleys )
+
+		# Valley names and codes
+		self.valleys = self.kinematics.valleys
+		self.codes 	 = self.kinematics.codes
+
+		# Cache valley parameters: m, sqrt(2m)/hbar, hbar/m and hbar^2/2m
+		self.mass 	 = self.kinematics.mass
+		self.kfactor = self.kinematics.kfactor
+		self.hbarm 	 = self.kinematics.hbarm
+		self.c 		 = self.kinematics.c
+
 		# Electron valley occupancy
-		self.valley = valley
+		self.code = self.codes[valley] if valley is not None else 0
 
 		# Initialize some perameters
-		self.m = self.material.effectiveMass( valley )
-		self.K = cylindricalWavevector(0.0, 0.0)
-		self.E = 0.0
-		self.v = 0.0
+		self.m  = self.mass[self.code]
+		self.kz = 0.0
+		self.kr = 0.0
+		self.E  = 0.0
+		self.v  = 0.0
+
+	# Electron valley occupancy (name)
+	@property
+	def valley(self):
+
+		return self.valleys[self.code]
+
+	# Electron wavevector 
+	@property
+	def K(self):
+
+		return cylindricalWavevector(self.kz, self.kr)
 
-	# Update electron state
+	# Return magnitude of wavevector for energy E in valley (code)
+	def magK(self, code, E):
+
+		return self.kfactor[code] * math.sqrt(E) if E > 0.0 else 0.0
+
+	# Update electron state (legacy interface)
 	def update(self, E, K, valley ):
-	
+
+		self.scatter( K.kz, K.kr, E, self.codes[valley] )
+
+	# Update electron state after scattering into valley (code) 
+	def scatter(self, kz, kr, E, code):
+
 		# Electron valley occupancy
-		self.valley = valley
+		self.code = code
 
 		# Update perameters
-		self.m = self.material.effectiveMass( valley )
-		self.K = K
-		self.E = E if E >= 0 else 0.0
-		self.v = ( self.K.kz * self.material.hbar ) / self.m
+		self.m  = self.mass[code]
+		self.kz = kz
+		self.kr = kr
+		self.E  = E if E >= 0 else 0.0
+		self.v  = kz * self.hbarm[code]
+
+	# Update electron state for acceleration of the axial wavevector
+	def accelerate(self, dKz):
+
+		self.kz += dKz
+		self.E 	 = self.c[self.code] * ( self.kz**2 + self.kr**2 )
+		self.v 	 = self.kz * self.hbarm[self.code]
 
 # The purpouse of this class is to process to prepare wavevectors an electron that has 
 # undergone a scattering event into a state with energy Ef. For scattering events, we 
@@ -77,146 +207,337 @@ class solidStateElectron:
 # the electric field.
 class scatteringEventProcessor:
 
-	# Namespace
-	def __init__(self, rates):
+	# Namespace. If alias is set, scattering events are selected from precomputed 
+	# alias tables in constant time. Alias tables are built on the energy grid and 
+	# are not interpolated. A random number stream may be passed in order to share it 
+	# with the simulation, otherwise an unseeded stream is created. 
+	#
+	# If bands is given (number of bands or list of band edges in eV), the energy axis 
+	# is split into bands each with its own maximum scattering rate (variable Gamma). 
+	# Otherwise a single maximum scattering rate is used for each valley. Note that with 
+	# variable Gamma, events are no longer uniformly distributed in time, so averages 
+	# over events must be weighted by flight time.
+	def __init__(self, rates, interpolate = False, alias = False, stream = None, bands = None):
 
 		# Random number generator
-		self.random = random.SystemRandom()
+		self.random = stream if stream is not None else randomStream()
 
 		# Store material scattering rates
 		self.rates = rates
 
+		# Build index into energy grid of scattering rates
+		self.index = energyIndex( self.rates.energy, interpolate )
+
+		# Energy bands for variable Gamma scheme
+		self.bands = bands
+
+		# Valley names (ordered as the valley codes of solidStateElectron) and kinematic
+		# constants and process tables of the material
+		self.valleys 	= self.rates.valleys
+		self.kinematics = materialKinematics( self.rates.material, self.valleys, self.rates )
+
+		# Count real and self scattering events
+		self.scatteringCount = {"real" : 0, "self" : 0}
+
 		# Buils scattering matrices
 		self.buildScatteringMatrices()
 
+		# Build process tables
+		self.buildProcessTables()
+
+		# Build alias tables
+		self.alias = alias
+
+		if self.alias:
+
+			self.buildAliasTables()
+
 	# Return magnitude of wavevector given energy: 
 	# 	|k|^2 = 2mE/hbar^2
 	def magK(self, mass, Ef): 
 
-		# Initialize physical constants
-		const = physicalConstants()
-
 		# Protect negative energy
 		Ef = Ef if Ef >= 0 else 0.0
 
 		# Return magnitude of wavevector
-		return np.sqrt( (2.0 * mass * Ef ) / (const.hbar**2) )
+		return math.sqrt( 2.0 * mass * Ef ) / self.kinematics.hbar
 
 	# Return energy for a given wavevector
 	def magE(self, mass, Kf ):
 
-		const = physicalConstants()
+		return ( Kf.mag * self.kinematics.hbar )**2 / (2.0 * mass)
 
-		return ( Kf.mag * const.hbar)**2 / (2.0 * mass)
+	# Method to simulate the time between scattering events. The electric field is 
+	# needed in the variable Gamma scheme to follow the electron across bands.
+	def generateFlightTime(self, electron, field = 0.0):
 
-	# Method to simulate the time between scattering events. 
-	def generateFlightTime(self, electron):
+		# Variable Gamma scheme
+		if self.bands is not None:
 
-		# Throw a random number on interval [0, 1]
-		r = self.random.random()
+			return self.generateBandFlightTime(electron, field)
+
+		# Throw a random number on interval (0, 1] to protect the logarithm
+		r = 1.0 - self.random.random()
+
+		# Simulate new time interval with total scattering rate for current valley
+		return ( -1.0 / self.maxRates[electron.code] ) * math.log(r)
+
+	# Method to simulate the time between scattering events in the variable Gamma
+	# scheme. A flight is generated with the maximum scattering rate of the current 
+	# band. If the electron leaves the band before the end of the flight, the flight 
+	# is truncated at the band edge and continued with the maximum scattering rate of 
+	# the new band. This is exact as the flight time distribution is memoryless.
+	def generateBandFlightTime(self, electron, field):
 
-		# Get total scattering rate for current valley
-		if electron.valley in ["G", "Gamma"]:
+		# Band of current electron energy and maximum rates in current valley
+		band 	= self.columnBand[ self.index.nearest(electron.E) ]
+		ceiling = self.bandCeilings[electron.valley]
 
-			# Simulate new time interval
-			tau  = ( -1.0/ self.Gmax ) * np.log(r)
+		# Rate of change of axial wavevector and energy scale: E = c |K|^2
+		a = -field / electron.material.hbar
+		c = electron.c[electron.code]
 
-		if electron.valley in ["L"]:
+		# Follow electron through bands
+		kz, kr, tau = electron.kz, electron.kr, 0.0
 
-			# Simulate new time interval
-			tau  = ( -1.0/ self.Lmax ) * np.log(r)
-			
-		# Return free flight time
-		return tau
+		while True:
 
-	# A method to increment the k-vector for acceleration under free flight
-	def accelerationEvent(self, electron, dK):
+			# Throw a random number on interval (0, 1] to protect the logarithm
+			r = 1.0 - self.random.random()
+			t = ( -1.0 / ceiling[band] ) * math.log(r)
 
-		# Valley occupancy is unchanged
-		Vf  = electron.valley
+			# Time to leave current band
+			tc, step = self.bandCrossing( kz, kr, c, a, band )
+			tc, step = float(tc), int(step)
 
-		# Updare electron weavevector. For free acceleration in an electric 
-		# field, all energy goes into axial component.
-		Kzf = electron.K.kz + dK.kz
-		Krf = electron.K.kr
+			if t < tc:
 
-		# Initialize cylindrical wavevector
-		Kf  = cylindricalWavevector( Kzf, Krf )
+				return tau + t
 
-		# Calculate total energy afer increment
-		Ef  = self.magE( electron.m, Kf )
+			# Move electron to band edge
+			tau  += tc
+			kz   += a * tc
+			band += step
+
+	# Method to calculate the time at which electron(s) with wavevector (kz, kr) 
+	# under acceleration dkz/dt = a leave band. Returns the crossing time and 
+	# the band step (+1 up, -1 down). Time is inf if the electron never leaves. 
+	# Accepts scalars or arrays.
+	def bandCrossing(self, kz, kr, c, a, band):
+
+		lo = self.bandEdges[band]
+		hi = self.bandEdges[band + 1]
+
+		with np.errstate(divide = "ignore", invalid = "ignore"):
+
+			# The energy c * ( (kz + a*t)^2 + kr^2 ) reaches edge E when 
+			# (kz + a*t) = +/- sqrt(E/c - kr^2). Energy is increasing at 
+			# the upper edge and decreasing at the lower edge.
+			t_hi = ( np.sign(a) * np.sqrt( hi / c - kr**2 ) - kz ) / a
+			t_lo = (-np.sign(a) * np.sqrt( lo / c - kr**2 ) - kz ) / a
+
+		# Protect unreachable edges 
+		t_hi = np.where( np.isfinite(t_hi) & (t_hi > 0.0), t_hi, np.inf )
+		t_lo = np.where( np.isfinite(t_lo) & (t_lo > 0.0), t_lo, np.inf )
+
+		return np.minimum( t_hi, t_lo ), np.where( t_hi < t_lo, 1, -1 )
+
+	# Method to report the fraction of self scattering events
+	def selfScatteringFraction(self):
+
+		events = self.scatteringCount["real"] + self.scatteringCount["self"]
+
+		return self.scatteringCount["self"] / events if events > 0 else 0.0
+
+	# A method to increment the k-vector for acceleration under free flight. For 
+	# free acceleration in an electric field, all energy goes into axial component.
+	# Valley occupancy is unchanged.
+	def accelerationEvent(self, electron, dKz):
 
 		# Update electron state
-		electron.update(Ef, Kf, Vf)
+		electron.accelerate(dKz)
 
-	# Method to build the scattering matrices
-	def buildScatteringMatrices(self):
+	# Method to build energy bands for the variable Gamma scheme. Bands are aligned 
+	# to the energy grid: each column belongs to one band and band edges are placed 
+	# halfway between columns, such that the band of an energy is the band of its 
+	# nearest column. Without bands, a single band covers the whole grid.
+	def buildEnergyBands(self):
+
+		energy = self.rates.energy
+
+		# First column of each band 
+		if self.bands is None:
+
+			start = np.array( [0, len(energy)] )
+
+		elif np.ndim(self.bands) == 0:
 
-		# Cache maximum scattering rate (G valley)
-		self.Gmax = max( self.rates.getScatteringRate( ["Gsum"] ) )
+			start = np.linspace( 0, len(energy), int(self.bands) + 1 ).astype(int)
 
-		Gmat = np.zeros( ( 7 ,len(self.rates.energy) ) )
+		else:
 
-		for index in range( 5 ):
+			start = np.concatenate( ( [0], np.searchsorted( energy, self.bands ), [len(energy)] ) )
 
-			Gmat[index + 1, :] = Gmat[index, :] + self.rates.getScatteringRate( [index, "G"] ) / self.Gmax
+		start = np.unique( np.clip( start, 0, len(energy) ) )
 
-		Gmat[6, :] = np.ones( len(self.rates.energy) )
+		# Band of each column 
+		self.columnBand = np.repeat( np.arange( len(start) - 1 ), np.diff(start) )
 
-		# Cache maximum scattering rate (L valley)
-		self.Lmax = max( self.rates.getScatteringRate( ["Lsum"] ) )
+		# Band edges (eV). The first and last bands are open.
+		midpoint = ( energy[:-1] + energy[1:] ) / 2.0
 
-		Lmat = np.zeros( ( 9 ,len(self.rates.energy) ) )
+		self.bandEdges = np.concatenate( ( [-np.inf], midpoint[ start[1:-1] - 1 ], [np.inf] ) )
 
-		for index in range( 7 ):
+		# Maximum scattering rate in each band for each valley. Bands without 
+		# scattering fall back on the maximum rate of the valley
+		self.bandCeilings = {}
 
-			Lmat[index + 1, :] = Lmat[index, :] + self.rates.getScatteringRate( [index, "L"] ) / self.Lmax
+		for valley, vmax in zip( self.valleys, self.maxRates ):
 
-		Lmat[8, :] = np.ones( len(self.rates.energy) )		
+			rate = self.rates.getScatteringRate( ["%ssum"%valley] )
+
+			ceiling = np.array( [ np.max( rate[_s:_e] ) for _s, _e in zip( start[:-1], start[1:] ) ] )
+
+			self.bandCeilings[valley] = np.where( ceiling > 0.0, ceiling, vmax )
+
+	# Method to build the scattering matrices. Scattering rates in each column are 
+	# normalized to the maximum scattering rate of the band of that column. For a 
+	# valley with n processes the matrix has n + 2 rows: a row of zeros, the cumulative 
+	# normalized rates, and a row of ones (the interval above the last process is
+	# self scattering).
+	def buildScatteringMatrices(self):
+
+		# Cache maximum scattering rate of each valley (indexed by valley code)
+		self.maxRates = [ max( self.rates.getScatteringRate( ["%ssum"%_v] ) ) for _v in self.valleys ]
+
+		# Build energy bands
+		self.buildEnergyBands()
 
 		# Build an object to hold the scattering matrices
-		self.scatteringMatrices = {
-			"G" : Gmat,
-			"L" : Lmat
-		}
+		self.scatteringMatrices = {}
 
-	# Method to generate scattering event	
-	def generateScatteringEvent(self, electron):
+		for valley in self.valleys:
+
+			# Rates of each process (process, energy)
+			rates = np.array( [ self.rates.getScatteringRate( [index, valley] ) 
+				for index in range( self.rates.processCount(valley) ) ] ).reshape( -1, len(self.rates.energy) )
+
+			mat = np.zeros( ( len(rates) + 2, len(self.rates.energy) ) )
+
+			mat[1:-1, :] = np.cumsum( rates / self.bandCeilings[valley][self.columnBand], axis = 0 )
+			mat[-1, :] 	 = 1.0
+
+			self.scatteringMatrices[valley] = mat
+
+	# Method to build process tables indexed by valley code and process index. For 
+	# each valley, the change in energy, final valley code and symmetry code of each 
+	# process are taken from the kinematics bundle. The last process index is self 
+	# scattering.
+	def buildProcessTables(self):
+
+		self.processTables = self.kinematics.processes
+
+	# Method to build Walker/Vose alias tables from the scattering matrices. For each 
+	# valley and energy column, the K event probabilities (including self scattering 
+	# in the last slot) are stored as a pair of tables (prob, alias) of shape (K, energy). 
+	# An event is selected by throwing a slot uniformly on [0, K) and accepting the slot 
+	# with probability prob[slot], otherwise taking alias[slot].
+	def buildAliasTables(self):
 
-		# Find the column index in scattering matrix for the current electron energy. 
-		# This approximates the scattering rates for that energy
-		tmp = abs( self.rates.energy - electron.E)
-		col = list(tmp).index( min(tmp) )
+		self.aliasTables = {}
 
-		# Extract the scattering rates from the scattering matrix
-		R = self.scatteringMatrices[electron.valley][:, col]		
+		for valley, mat in self.scatteringMatrices.items():
+
+			# Event probabilities scaled by number of slots (K, energy)
+			q = np.diff(mat, axis = 0)
+			K, N = q.shape
+			q = np.clip(q, 0.0, None) * K / np.sum(q, axis = 0)
+
+			# Alias tables. Slots are aliased to themselves by default
+			prob  = np.ones( (K, N) )
+			alias = np.tile( np.arange(K)[:, np.newaxis], (1, N) )
+
+			# Slots which have been finalized in each column
+			done = np.zeros( (K, N), dtype=bool )
+			cols = np.arange(N)
+
+			# Each pass finalizes one (small) slot per column by pairing it with
+			# the largest remaining slot which donates the missing probability.
+			for _ in range(K - 1):
+
+				small = np.argmin( np.where(done, np.inf, q), axis = 0 )
+				done[small, cols] = True
+
+				large = np.argmax( np.where(done, -np.inf, q), axis = 0 )
+
+				prob[small, cols]  = np.minimum( q[small, cols], 1.0 )
+				alias[small, cols] = large
+
+				q[large, cols] -= 1.0 - prob[small, cols]
+
+			self.aliasTables[valley] = ( prob, alias )
+
+	# Method to select a scattering event index for the electron. The last index 
+	# corresponds to self scattering.
+	def selectScatteringEvent(self, electron):
+
+		# Constant time selection from alias tables
+		if self.alias:
+
+			prob, alias = self.aliasTables[electron.valley]
+
+			# Column for the current electron energy 
+			col  = self.index.nearest( electron.E )
+
+			# Throw a slot on interval [0, K) and a random number on [0, 1] 
+			slot = int( self.random.random() * prob.shape[0] )
+
+			return slot if self.random.random() < prob[slot, col] else int(alias[slot, col])
+
+		# Extract the scattering rates from the scattering matrix at the column for 
+		# the current electron energy. This approximates the scattering rates for 
+		# that energy (nearest grid point or linear interpolation).
+		R = self.index.lookup( self.scatteringMatrices[electron.valley], electron.E )
 
 		# Throw a random number on interval [0, 1] to determine which event we will 
 		r = self.random.random()
 
 		# Find the index of scattering event. This is the index of the lower value 
 		# of the values that r is between in R.
-		index = np.argmax( R > r ) - 1
+		return np.argmax( R > r ) - 1
+
+	# Method to generate scattering event	
+	def generateScatteringEvent(self, electron):
 
-		# Get the corresponding scattering event metadata. getScatteringMeta will 
-		# return None if we end up in the last slot of the scattering matrix. 
-		meta = self.rates.getScatteringMeta( [index, electron.valley] )
+		# Find the index of scattering event
+		index = self.selectScatteringEvent(electron)
+
+		# Get the corresponding process metadata. The last slot of the scattering 
+		# matrix is self scattering (symmetry code 0).
+		dE, Vf, sym = self.processTables[electron.code]
 		
+		# Count self scattering events
+		if sym[index] == 0:
+
+			self.scatteringCount["self"] += 1
+
 		# If we have thrown a real scattering event, must update the electron state
-		if meta is not None:
+		else:
+
+			self.scatteringCount["real"] += 1
 
-			if meta["sym"] == "isotropic": 
+			if sym[index] == 1: 
 
-				self.isotropicScatteringEvent(electron, meta["dE"], meta["Vf"] )
+				self.isotropicScatteringEvent(electron, dE[index], Vf[index] )
 
-			if meta["sym"] == "anisotropic": 
+			if sym[index] == 2: 
 
-				self.anisotropicScatteringEvent(electron, meta["dE"], meta["Vf"] )
+				self.anisotropicScatteringEvent(electron, dE[index], Vf[index] )
 
 	# This method simulates isotropic scattering events by generating a randomly 
 	# oriented wavevector for an electron that has scattered into a state with 
-	# energy (Ef) in dispersion valley (Vf) in ['Gamma', 'L'] and updates the 
-	# electron state accordingly.
+	# energy (Ef) in dispersion valley (Vf, valley code) and updates the electron 
+	# state accordingly.
 	def isotropicScatteringEvent(self, electron, dE, Vf):
 
 		# Throw a random number on interval [0, 1]
@@ -227,62 +548,58 @@ class scatteringEventProcessor:
 
 		# Protect negative energy
 		Ef = Ef if Ef >= 0 else 0.0
-		
-		# Extract the effective mass for the final state valley 
-		m  = electron.material.effectiveMass(Vf)
-
-		# After an isotropic scattering event, the angle with respect to the 
-		# electric field oriented randomly on the interval [0, 2pi]. 
-		Kzf = self.magK(m, Ef) * np.cos( 2.0 * np.pi * r ) 
 
-		# Calculate the radial component of the wavevector: |K|^2 = Kz^2 + Kr^2 
-		Krf = self.magK(m, Ef) * np.sin( 2.0 * np.pi * r )
+		# Magnitude of wavevector in final state valley
+		K = electron.magK(Vf, Ef)
 
-		# Initialize cylindrical wavevector
-		Kf  = cylindricalWavevector( Kzf, Krf )
+		# After an isotropic scattering event, the angle with respect to the 
+		# electric field oriented randomly on the interval [0, 2pi]. The radial 
+		# component of the wavevector follows from |K|^2 = Kz^2 + Kr^2 
+		Kzf = K * math.cos( 2.0 * math.pi * r ) 
+		Krf = K * math.sin( 2.0 * math.pi * r )
 
 		# Update electron state
-		electron.update(Ef, Kf, Vf)
+		electron.scatter(Kzf, Krf, Ef, Vf)
 
 	# This method generates a wavevector that is preferentially oriented along 
-	# the original wavevector. 
+	# the original wavevector. The final valley (Vf) is given as valley code.
 	def anisotropicScatteringEvent(self, electron, dE, Vf):
 
 		# Store initial and final energies
 		Ei = electron.E
 		Ef = electron.E + dE
 
-		# Extract the effective mass for the final state valley 
-		m  = electron.material.effectiveMass(Vf)
-
 		# Throw a random number on interval [0, 1]
 		r  = self.random.random()
 
-		if (Ef >= 0):
+		# Forward scattering is assumed when the transition is not allowed
+		if Ef > 0.0 and Ei > 0.0:
 
 			# The parameter (xi) governing anisotropic scattering
-			xi = 2.0 * np.sqrt( Ei * Ef ) / ( np.sqrt(Ei) - np.sqrt(Ef) )**2
+			xi = 2.0 * math.sqrt( Ei * Ef ) / ( math.sqrt(Ei) - math.sqrt(Ef) )**2
 
 			# Calculate cos(theta) : theta scattering angle in a rotated system
-			cos_theta = ( (1 + xi) - np.power( 1.0 + 2.0 * xi, r) ) / xi
+			cos_theta = ( (1 + xi) - ( 1.0 + 2.0 * xi )**r ) / xi
 
 		else: 
 
 			cos_theta = 1.0
 
-		sin_theta = np.sqrt(1 - cos_theta**2)
-		cos_phi   = np.cos(2.0 * np.pi * r)
+		sin_theta = math.sqrt( max( 1.0 - cos_theta**2, 0.0 ) )
+		cos_phi   = math.cos( 2.0 * math.pi * r )
 
 		# Components in unrotated coordinate system
-		cos_alpha = electron.K.kz / electron.K.mag
-		sin_alpha = np.sqrt(1.0 - cos_alpha**2)
-	
+		Kmag 	  = math.hypot( electron.kz, electron.kr )
+		cos_alpha = electron.kz / Kmag if Kmag > 0.0 else 1.0
+		sin_alpha = math.sqrt( max( 1.0 - cos_alpha**2, 0.0 ) )
+
 		# Calculate the new k componenets
-		Kzf = self.magK(m, Ef) * ( cos_alpha * cos_theta - sin_alpha * sin_theta *cos_phi )
-		Krf = self.magK(m, Ef) * np.sqrt(1 - ( cos_alpha * cos_theta - sin_alpha * sin_theta *cos_phi )**2)
+		cos_f = cos_alpha * cos_theta - sin_alpha * sin_theta * cos_phi
+		cos_f = min( max( cos_f, -1.0 ), 1.0 )
+		K 	  = electron.magK(Vf, Ef)
 
-		# Initialize cylindrical wavevector
-		Kf  = cylindricalWavevector( Kzf, Krf )
+		Kzf = K * cos_f
+		Krf = K * math.sqrt( 1.0 - cos_f**2 )
 
 		# Update electron state
-		electron.update(Ef, Kf, Vf)
+		electron.scatter(Kzf, Krf, Ef, Vf)
@@ -26,90 +26,196 @@
 
 #!/usr/bin/env python 
 import numpy as np
-import random
+
+# Import random number streams
+from ..utilities.randomStream import randomStream
 
 # Import scattering rates object
 from ..solidstate.materialScatteringRates import materialScatteringRates
 
 # Import simulation local utilities
 from .scatteringEventProcessor import solidStateElectron
-from .scatteringEventProcessor import cylindricalWavevector
 from .scatteringEventProcessor import scatteringEventProcessor
+from .trajectoryResult import trajectoryResult
+from .trajectoryStatistics import trajectoryStatistics
+from .trajectoryStatistics import integrateFlight
 
 # A class to simulate velocity saturation with intervalley scattering. 
 # via Monte Carlo methods.
 class scatteringMonteCarlo:
 
-	# We want to 
+	# Initialize simulation. The random number stream is identified by the optional 
+	# config keys "seed" (master seed) and "stream" (spawn key), such that a simulation 
+	# can be replayed. The optional config key "bands" enables the variable Gamma 
+	# scheme (see scatteringEventProcessor). Events are then not uniform in time, so
+	# "bands" requires "statistics" (time weighted averages). The optional config 
+	# key "precision" sets the dtype of stored energies and velocities (default 
+	# np.float64). If the optional config key "statistics" is set, the trajectory is
+	# not stored and only running statistics are accumulated (see trajectoryStatistics).
+	#
+	# If the optional config key "target" (standard error of drift velocity in cm/s) 
+	# is set, the simulation is extended in batches of "batch" events beyond "events"
+	# until the batch means standard error falls below target or "maxEvents" is hit.
+	#
+	# If the optional config key "rates" holds a materialScatteringRates object (e.g.
+	# attached from shared memory), it is used instead of calculating the rates. The
+	# optional config key "cache" sets an on-disk cache directory for the rates.
+	#
+	# If the optional config key "warmup" is set, warmup events are simulated and 
+	# discarded before events are recorded, such that results do not depend on the
+	# initial state (e.g. for independent chunks of a field, see velocityFieldSimulation).
+	#
+	# If the optional config key "columns" holds preallocated trajectory columns 
+	# {"time", "valley", "energy", "velocity"} (e.g. views into shared memory), the 
+	# trajectory is written into them (see trajectoryResult).
 	def __init__(self, config):
 
 		# Random number generator
-		self.random = random.SystemRandom()
+		self.random = randomStream( 
+			config["seed"] if "seed" in config else None,
+			config["stream"] if "stream" in config else ()
+		)
 
 		# Store sinulation configuration data
-		self.material = config["material"]
-		self.energy   = config["energy"]
-		self.field	  = config["field"]
-		self.events   = config["events"] 
+		self.material   = config["material"]
+		self.energy     = config["energy"]
+		self.field	    = config["field"]
+		self.events     = config["events"]
+		self.precision  = config["precision"] if "precision" in config else np.float64
+		self.statistics = config["statistics"] if "statistics" in config else False
+		self.warmup 	= config["warmup"] if "warmup" in config else 0
+		self.columns 	= config["columns"] if "columns" in config else None
+
+		# Convergence settings
+		self.target 	= config["target"] if "target" in config else None
+		self.batch 		= config["batch"] if "batch" in config else 10000
+		self.maxEvents 	= config["maxEvents"] if "maxEvents" in config else 10 * self.events
 
-		# Initialize solid state electron object
-		self.electron = solidStateElectron( self.material, "G" )
+		# Event averages of a variable Gamma trajectory are biased
+		if "bands" in config and config["bands"] is not None and not self.statistics:
+
+			raise ValueError("scatteringMonteCarlo: \"bands\" (variable Gamma) requires \"statistics\"")
 
 		# Calculate scattering rates for phonon processes
-		self.rates = materialScatteringRates( self.energy, self.material )
+		self.rates = config["rates"] if "rates" in config else materialScatteringRates( self.energy, self.material, 
+			cache = config["cache"] if "cache" in config else None )
 
 		# Build scattering event processor for calculated rates
-		self.Processor = scatteringEventProcessor( self.rates )
+		self.Processor = scatteringEventProcessor( self.rates, 
+			stream = self.random, 
+			bands  = config["bands"] if "bands" in config else None
+		)
+
+		# Initialize solid state electron object sharing the kinematics of the processor
+		self.electron = solidStateElectron( self.material, kinematics = self.Processor.kinematics )
 
 	# This method will randomize the initial state of the electon	
 	def randomizeInitial(self, Emax = 0.05):
 		
 		r = self.random.random()
 
-		# Initialize scattering event processor 
-		self.Processor.isotropicScatteringEvent(self.electron, Emax*r, "G")
+		# Initialize scattering event processor (electron starts in the lowest valley)
+		self.Processor.isotropicScatteringEvent(self.electron, Emax*r, 0)
+
+		# Simulation time
+		self.time = 0.0
+
+		# Initialize result container
+		self.resetResult()
+
+	# Method to (re)initialize the result container with the current electron state
+	def resetResult(self):
+
+		# Container for running statistics or preallocated container to store results
+		if self.statistics:
 
-		# Dictionary to store results
-		self.result = {
-			"time" 		: [0.0],
-			"valley"	: [self.electron.valley],
-			"energy"	: [self.electron.E],
-			"velocity"	: [self.electron.v],
-			"field"		: self.field
-		}
+			self.result = trajectoryStatistics( valleys = self.electron.valleys, batch = self.batch )
+
+		else:
+
+			self.result = trajectoryResult( capacity = int(self.events), precision = self.precision, valleys = self.electron.valleys, columns = self.columns )
+
+		self.result["field"]  = self.field
+		self.result["random"] = self.random.describe()
+
+		# Store initial state
+		self.result.append( self.time, self.electron.code, self.electron.E, self.electron.v )
 
 	# Apply electric field to electron for simulated flight time (tau)
 	def applyElectricField(self):
 
 		# Generate a flight time for our electon 
-		tau  = self.Processor.generateFlightTime(self.electron)
-		time = self.result["time"][-1] + tau
-		self.result["time"].append(time)
+		tau  = self.Processor.generateFlightTime(self.electron, self.field)
+		self.time += tau
 
-		# Calculate the change in components wavevector 
-		# due to acceleration in an electric field
+		# Calculate the change in axial wavevector due to acceleration 
+		# in an electric field
 		dKz = ( -self.field * tau) / self.material.hbar
-		dKr = 0.0
-
-		# Initialize wavevector
-		dK  = cylindricalWavevector(dKz, dKr)
 
 		# Update electron state
-		self.Processor.accelerationEvent(self.electron, dK)
+		self.Processor.accelerationEvent(self.electron, dKz)
+
+		# Return flight time
+		return tau
 
 	# Run the simulation
 	def run(self):
 
+		# Simulate and discard warmup events
+		if self.warmup > 0:
+
+			self.simulateEvents( int(self.warmup) )
+			self.resetResult()
+
+		# Simulate the requested number of events
+		self.simulateEvents( int(self.events) - 1 )
+
+		# Extend simulation in batches until converged
+		if self.target is not None:
+
+			while self.standardError() > self.target and self.eventCount() + self.batch <= self.maxEvents:
+
+				self.simulateEvents( int(self.batch) )
+
+			# Store achieved uncertainty
+			self.result["standardError"] = self.standardError()
+
+		# Store fraction of self scattering events
+		self.result["selfScattering"] = self.Processor.selfScatteringFraction()
+
+	# Method to return the number of stored events
+	def eventCount(self):
+
+		return self.result.events if self.statistics else self.result.size
+
+	# Method to return the batch means standard error of drift velocity
+	def standardError(self):
+
+		if self.statistics:
+
+			return self.result.standardError("velocity")
+
+		return self.result.standardError("velocity", self.batch)
+
+	# Method to simulate a number of scattering events
+	def simulateEvents(self, events):
+
 		# Interate over number of scattering events
-		for _ in range( int(self.events) - 1 ):
+		for _ in range( events ):
+
+			# Store electron state before flight
+			E0, v0, m, code = self.electron.E, self.electron.v, self.electron.m, self.electron.code
 
 			# Apply electric field to electron
-			self.applyElectricField()
+			tau = self.applyElectricField()
+
+			# Accumulate flight statistics
+			if self.statistics:
+
+				self.result.flight( tau, code, *integrateFlight( tau, m, E0, v0, self.electron.v ) )
 
 			# Simulate scattering event
 			self.Processor.generateScatteringEvent(self.electron)
 
-			# Update energy vector
-			self.result["valley"].append(self.electron.valley)
-			self.result["energy"].append(self.electron.E)	
-			self.result["velocity"].append(self.electron.v)
+			# Store electron state
+			self.result.append( self.time, self.electron.code, self.electron.E, self.electron.v )
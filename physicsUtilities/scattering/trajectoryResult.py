@@ -0,0 +1,182 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/scattering -> trajectoryResult.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# A container for the trajectory of a single particle Monte Carlo simulation. Time,
+# energy and velocity are stored in preallocated numpy arrays and valleys are stored
+# as uint8 codes. Arrays grow in chunks as events are appended.
+#
+# The container can be read like the result dictionary of scatteringMonteCarlo:
+#
+#	result["time"]		-> float64 array
+#	result["energy"]	-> float array (float64 or float32)
+#	result["velocity"]	-> float array (float64 or float32)
+#	result["valley"]	-> array of valley names, e.g. "G", "L"
+#
+# Any other key (e.g. "field") is stored as metadata. Pickled results only
+# contain the filled part of the arrays.
+#
+# Columns may be given as preallocated arrays (e.g. views into shared memory, see
+# asyncFactory.reserve), in which case events are written in place. Arrays are 
+# copied out of place only if they must grow beyond their capacity.
+class trajectoryResult:
+
+	def __init__(self, capacity = 65536, chunk = 65536, precision = np.float64, valleys = ("G", "L"), columns = None):
+
+		# Number of stored events and growth increment
+		self.size  = 0
+		self.chunk = int(chunk)
+
+		# Valley names (valley codes index into valleys)
+		self.valleys = np.array(valleys)
+
+		# Preallocate columns
+		self.columns = dict(columns) if columns is not None else {
+			"time"		: np.empty( int(capacity), dtype=np.float64 ),
+			"valley"	: np.empty( int(capacity), dtype=np.uint8 ),
+			"energy"	: np.empty( int(capacity), dtype=precision ),
+			"velocity"	: np.empty( int(capacity), dtype=precision ),
+		}
+
+		# Owner of preallocated columns (e.g. shared arrays), kept alive with the columns
+		self.owner = None
+
+		# Dictionary to store metadata
+		self.meta = {}
+
+		# Cache of decoded valley names (cleared on append)
+		self.decoded = None
+
+	# Method to grow columns by one chunk
+	def grow(self):
+
+		for key, column in self.columns.items():
+
+			self.columns[key] = np.concatenate( ( column, np.empty( self.chunk, dtype=column.dtype ) ) )
+
+	# Method to append an event. Valley is given as integer code (index into valleys)
+	def append(self, time, code, energy, velocity):
+
+		if self.size == len( self.columns["time"] ):
+
+			self.grow()
+
+		self.columns["time"][self.size] 	= time
+		self.columns["valley"][self.size] 	= code
+		self.columns["energy"][self.size] 	= energy
+		self.columns["velocity"][self.size] = velocity
+
+		self.size 	+= 1
+		self.decoded = None
+
+	# Method to return the last value of a column
+	def last(self, key):
+
+		return self.columns[key][self.size - 1]
+
+	# Method to return the batch means standard error of the mean of key. The 
+	# trajectory is split into consecutive batches of batch events, and the 
+	# error is estimated from the scatter of the batch means.
+	def standardError(self, key, batch):
+
+		batches = self.size // int(batch)
+
+		if batches < 2:
+
+			return np.inf
+
+		means = np.mean( self[key][ : batches * int(batch) ].reshape( batches, int(batch) ), axis = 1 )
+
+		return np.std( means, ddof = 1 ) / np.sqrt( batches )
+
+	# Method to return valley codes (uint8) instead of valley names
+	def valleyCodes(self):
+
+		return self.columns["valley"][:self.size]
+
+	# Dictionary interface
+	def __getitem__(self, key):
+
+		# Valley names are decoded once and cached, as scripts index into them 
+		# event by event
+		if key == "valley":
+
+			if self.decoded is None:
+
+				self.decoded = self.valleys[ self.valleyCodes() ]
+
+			return self.decoded
+
+		if key in self.columns:
+
+			return self.columns[key][:self.size]
+
+		return self.meta[key]
+
+	def __setitem__(self, key, value):
+
+		if key in self.columns:
+
+			raise KeyError("trajectoryResult columns are read only: %s"%key)
+
+		self.meta[key] = value
+
+	def __contains__(self, key):
+
+		return key in self.columns or key in self.meta
+
+	def __iter__(self):
+
+		return iter( self.keys() )
+
+	def keys(self):
+
+		return list( self.columns.keys() ) + list( self.meta.keys() )
+
+	def items(self):
+
+		return [ ( key, self[key] ) for key in self.keys() ]
+
+	# Method to convert result to a dictionary of arrays
+	def asdict(self):
+
+		return dict( self.items() )
+
+	# Pickle only the filled part of the arrays
+	def __getstate__(self):
+
+		state = dict( self.__dict__ )
+		state["columns"] = { key : column[:self.size].copy() for key, column in self.columns.items() }
+		state["decoded"] = None
+		state["owner"] 	 = None
+
+		return state
+
+	def __setstate__(self, state):
+
+		self.__dict__.update(state)
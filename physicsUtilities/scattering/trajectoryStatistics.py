@@ -0,0 +1,245 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/scattering -> trajectoryStatistics.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Function to integrate velocity and energy (and their squares) over a free flight
+# of duration tau. Velocity is linear in time during the flight v(s) = v0 + s (v1 - v0)
+# and energy is quadratic E(s) = E0 + m v0 dv s + m dv^2 s^2 / 2 (s = t / tau). All
+# arguments may be numpy arrays (e.g. one flight per electron of an ensemble).
+def integrateFlight(tau, m, E0, v0, v1):
+
+	dv = v1 - v0
+
+	# Polynomial coefficients of energy E(s) = A + B s + C s^2
+	A, B, C = E0, m * v0 * dv, 0.5 * m * dv**2
+
+	v  = tau * ( v0 + v1 ) / 2.0
+	v2 = tau * ( v0**2 + v0 * v1 + v1**2 ) / 3.0
+	E  = tau * ( A + B / 2.0 + C / 3.0 )
+	E2 = tau * ( A**2 + A * B + ( 2.0 * A * C + B**2 ) / 3.0 + B * C / 2.0 + C**2 / 5.0 )
+
+	return v, v2, E, E2
+
+# A container which accumulates statistics of a single particle Monte Carlo
+# simulation on the fly, without storing the trajectory. Memory use does not
+# depend on the number of events. Two kinds of averages are accumulated:
+#
+#	event averages	: over the electron states after each scattering event
+#					  (append). These correspond to np.mean over a trajectory.
+#
+#	time averages	: over the free flights (flight). The simulation passes the
+#					  integrals of v, v^2, E, E^2 over each flight, such that
+#					  the averages are exact for any flight time distribution.
+#
+# Valley dwell times are accumulated for the valley in which each flight is spent.
+# The container can be read like a dictionary:
+#
+#	result["velocity"]	-> time averaged velocity
+#	result["energy"]	-> time averaged energy
+#	result["valley"]	-> dwell times {"G" : ..., "L" : ...}
+#	result["events"]	-> number of events
+#	result["time"]		-> total simulated time
+#
+# Any other key (e.g. "field") is stored as metadata. 
+#
+# If batch is given, the accumulated time and velocity/energy integrals are closed 
+# every batch events, such that standard errors can be estimated by batch means.
+class trajectoryStatistics:
+
+	def __init__(self, valleys = ("G", "L"), batch = None):
+
+		# Event statistics
+		self.events = 0
+		self.sum 	= {"energy" : 0.0, "velocity" : 0.0}
+		self.sumsq 	= {"energy" : 0.0, "velocity" : 0.0}
+
+		# Time weighted statistics
+		self.time 		= 0.0
+		self.integral 	= {"energy" : 0.0, "velocity" : 0.0}
+		self.integralsq = {"energy" : 0.0, "velocity" : 0.0}
+		self.valleys 	= tuple(valleys)
+		self.dwell 		= [ 0.0 for _v in valleys ]
+
+		# Batch statistics: (time, velocity integral, energy integral) of each batch
+		self.batch 	 = batch
+		self.batches = []
+		self.closed  = (0.0, 0.0, 0.0)
+
+		# Dictionary to store metadata
+		self.meta = {}
+
+	# Method to add an event (electron state after scattering). The signature
+	# matches trajectoryResult.append. Time is accumulated by flight().
+	def append(self, time, code, energy, velocity):
+
+		self.events += 1
+
+		self.sum["energy"] 		+= energy
+		self.sum["velocity"] 	+= velocity
+		self.sumsq["energy"] 	+= energy**2
+		self.sumsq["velocity"] 	+= velocity**2
+
+		# Close batch
+		if self.batch is not None and self.events % int(self.batch) == 0:
+
+			total = ( self.time, self.integral["velocity"], self.integral["energy"] )
+
+			self.batches.append( tuple( _t - _c for _t, _c in zip( total, self.closed ) ) )
+			self.closed = total
+
+	# Method to add a free flight of duration tau in valley (code), given the 
+	# integrals of velocity and energy (and their squares) over the flight.
+	def flight(self, tau, code, v, v2, E, E2):
+
+		self.time 			+= tau
+		self.dwell[code] 	+= tau
+
+		self.integral["velocity"] 	+= v
+		self.integral["energy"] 	+= E
+		self.integralsq["velocity"] += v2
+		self.integralsq["energy"] 	+= E2
+
+	# Method to add accumulated totals, e.g. the sums of one electron of an ensemble.
+	# Totals are given as (energy, velocity) pairs and dwell as a list of dwell times
+	# per valley code. Batches are (time, velocity integral, energy integral) tuples.
+	def accumulate(self, events, time, dwell, sum, sumsq, integral, integralsq, batches = ()):
+
+		self.events += int(events)
+		self.time 	+= time
+
+		for code, tau in enumerate(dwell):
+
+			self.dwell[code] += tau
+
+		for _i, key in enumerate(["energy", "velocity"]):
+
+			self.sum[key] 		 += sum[_i]
+			self.sumsq[key] 	 += sumsq[_i]
+			self.integral[key] 	 += integral[_i]
+			self.integralsq[key] += integralsq[_i]
+
+		self.batches.extend( [ tuple(_b) for _b in batches ] )
+
+	# Method to merge the statistics of an independent simulation (e.g. a chunk of
+	# events of the same field simulated from another random number stream)
+	def merge(self, other):
+
+		keys = ["energy", "velocity"]
+
+		self.accumulate( other.events, other.time, other.dwell, 
+			[ other.sum[_k] for _k in keys ], [ other.sumsq[_k] for _k in keys ], 
+			[ other.integral[_k] for _k in keys ], [ other.integralsq[_k] for _k in keys ], 
+			other.batches )
+
+		return self
+
+	# Method to return the mean of "energy" or "velocity". Time averaged by default.
+	def mean(self, key, weighted = True):
+
+		if weighted:
+
+			return self.integral[key] / self.time if self.time > 0.0 else np.nan
+
+		return self.sum[key] / self.events if self.events > 0 else np.nan
+
+	# Method to return the variance of "energy" or "velocity"
+	def variance(self, key, weighted = True):
+
+		if weighted:
+
+			return self.integralsq[key] / self.time - self.mean(key)**2 if self.time > 0.0 else np.nan
+
+		return self.sumsq[key] / self.events - self.mean(key, False)**2 if self.events > 0 else np.nan
+
+	# Method to return the batch means standard error of the time averaged mean 
+	# of "energy" or "velocity"
+	def standardError(self, key):
+
+		if len(self.batches) < 2:
+
+			return np.inf
+
+		batches = np.array(self.batches)
+		means 	= batches[:, 1 if key == "velocity" else 2] / batches[:, 0]
+
+		return np.std( means, ddof = 1 ) / np.sqrt( len(means) )
+
+	# Method to return the fractional valley occupancy
+	def occupancy(self, valley):
+
+		return self.dwell[ self.valleys.index(valley) ] / self.time if self.time > 0.0 else np.nan
+
+	# Dictionary interface
+	def __getitem__(self, key):
+
+		if key in ["energy", "velocity"]:
+
+			return self.mean(key)
+
+		if key == "valley":
+
+			return dict( zip( self.valleys, self.dwell ) )
+
+		if key == "events":
+
+			return self.events
+
+		if key == "time":
+
+			return self.time
+
+		return self.meta[key]
+
+	def __setitem__(self, key, value):
+
+		if key in ["energy", "velocity", "valley", "events", "time"]:
+
+			raise KeyError("trajectoryStatistics statistics are read only: %s"%key)
+
+		self.meta[key] = value
+
+	def __contains__(self, key):
+
+		return key in self.keys()
+
+	def __iter__(self):
+
+		return iter( self.keys() )
+
+	def keys(self):
+
+		return ["energy", "velocity", "valley", "events", "time"] + list( self.meta.keys() )
+
+	def items(self):
+
+		return [ ( key, self[key] ) for key in self.keys() ]
+
+	# Method to convert result to a dictionary
+	def asdict(self):
+
+		return dict( self.items() )
@@ -123,13 +123,26 @@ class GaAs(physicalConstants):
 		# GAMMA -> L valley energy gap (eV)
 		self.D = 0.36
 
+
+		##################################
+		# BAND MODEL
+		#
+
+		# Conduction band valleys: effective mass (eV/c^2), number of equivalent 
+		# valleys and energy of the valley minimum (eV). The lowest valley comes 
+		# first. Scattering processes are generated from this table (see 
+		# materialScatteringRates). A valley may restrict its processes by a list 
+		# "processes" of ["acoustic", "optical", "intervalley"].
+		self.valleys = {
+			"G" : {"mass" : self.mG, "degeneracy" : 1.0, 	 "energy" : 0.0},
+			"L" : {"mass" : self.mL, "degeneracy" : self.gL, "energy" : self.D},
+		}
+
 	# Method to return the effective mass	
 	def effectiveMass( self, valley ): 
 	
-		if valley in ["G", "GAMMA"]:
-
-			return self.mG
+		if valley in ["GAMMA"]:
 
-		if valley in ["L"]:
+			valley = "G"
 
-			return self.mL
\ No newline at end of file
+		return self.valleys[valley]["mass"]
\ No newline at end of file
@@ -25,103 +25,282 @@
 #
 
 #!/usr/bin/env python
+import copy
 import numpy as np
+import itertools
 
 # Import phonon scattering rates
 from .phononScatteringRates import phononScatteringRates
 from .phononScatteringRates import phononScatteringData
 
-# Plotting
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
+# Import on-disk scattering rate cache
+from .scatteringRatesCache import scatteringRatesCache
 
-# Container class for material phonons
+# Method to build a scattering rates dictionary from stacked tables. Row 0 of tables
+# is the energy grid, row i + 1 holds the rate of process keys[i] with metadata meta[i]. 
+# Rates are views into tables (see materialScatteringRates.exportTables).
+def importTables(keys, meta, tables):
+
+	return {
+		tuple(key) : phononScatteringData( rate = tables[_i + 1, :], meta = _meta ) 
+			for _i, ( key, _meta ) in enumerate( zip( keys, meta ) )
+	}
+
+# Symmetry codes of scattering processes (see materialScatteringRates.processArrays). 
+# Code 0 is reserved for self scattering.
+symmetryCodes = {"isotropic" : 1, "anisotropic" : 2}
+
+# Container class for material phonons. Scattering processes are keyed by tuples
+#
+#	(index, valley, name, mode)		e.g. (1, "G", "Gop", "Absorption")
+#
+# and are looked up by any combination of key components, e.g. [index, valley], 
+# [name, mode] or [name]. Lookups go through a registry which maps each such
+# combination to its process, such that lookups take constant time.
 class materialScatteringRates:
 
-	def __init__(self, energy, material):
+	# Scattering rates are calculated for the energy grid, unless prebuilt scattering 
+	# rates (dictionary keyed as in buildScatteringRates) are given. Prebuilt rates are 
+	# used to attach to tables published by another process (sharedScatteringRates).
+	#
+	# If a cache directory is given, rates are loaded from the on-disk cache when 
+	# available, and stored in the cache otherwise (see scatteringRatesCache).
+	def __init__(self, energy, material, scatteringRates = None, cache = None):
 
 		# Phonon scattering rates
 		self.PSR = phononScatteringRates()
 
+		# Lookup scattering rates in cache
+		if scatteringRates is None and cache is not None:
+
+			cache  = scatteringRatesCache(cache)
+			tables = cache.load(energy, material)
+
+			if tables is not None:
+
+				scatteringRates = importTables( *tables )
+
 		# Build scattering rates
-		self.buildScatteringRates(energy, material)
+		if scatteringRates is None:
+
+			self.buildScatteringRates(energy, material)
+
+		else:
+
+			self.scatteringRates = scatteringRates
 
 		# Store energy vector and material (for plotting)
 		self.material = material
 		self.energy   = energy 
 
+		# Index scattering processes
+		self.buildRegistry()
+
+		# Store calculated scattering rates in cache
+		if cache is not None and not cache.contains(energy, material):
+
+			cache.store(self)
+
+	# Method to describe the scattering processes of the band model of the material
+	# (material.valleys). Returns a list of (valley, name, mode, method, kwargs) in 
+	# which method (phononScatteringRates) is called with kwargs to build the rate. 
+	# For each valley, processes are listed in the order:
+	#
+	#	acoustic 	: "Gac"
+	#	optical 	: "Gop" (Absorption, Emission)
+	#	intervalley : "GtoL" (Absorption, Emission) for each final valley
+	#
+	# Intervalley scattering between equivalent valleys is included when the valley
+	# is degenerate. The process index is the position within the valley.
+	def scatteringProcesses(self, material):
+
+		processes = []
+
+		for valley, params in material.valleys.items():
+
+			types = params["processes"] if "processes" in params else ["acoustic", "optical", "intervalley"]
+
+			if "acoustic" in types:
+
+				processes.append( ( valley, "%sac"%valley, None, "acousticPhonons", {"valley" : valley} ) )
+
+			if "optical" in types:
+
+				for mode in ["Absorption", "Emission"]:
+
+					processes.append( ( valley, "%sop"%valley, mode, "opticalPhonons", {"mode" : mode, "valley" : valley} ) )
+
+			if "intervalley" in types:
+
+				for final, _params in material.valleys.items():
+
+					# No equivalent valleys to scatter into
+					if final == valley and _params["degeneracy"] <= 1:
+
+						continue
+
+					for mode in ["Absorption", "Emission"]:
+
+						processes.append( ( valley, "%sto%s"%(valley, final), mode, "intervalleyPhonons", 
+							{"mode" : mode, "Vi" : valley, "Vf" : final} ) )
+
+		return processes
+
 	# Method to build scattering rates over energy range
 	def buildScatteringRates(self, energy, material):
 		
 		# Scattering rates are to be stored in a tuple keyed dictionary
-		self.scatteringRates = {
-
-			# Gamma valley
-			# Acoustic phonons
-			(0, "G", "Gac", None) 			: self.PSR.acousticPhonons(energy, material, valley="G"),
-
-			# Optical phonons
-			(1, "G", "Gop", "Absorption")	: self.PSR.opticalPhonons(energy, material, mode="Absorption", valley="G"),
-			(2, "G", "Gop", "Emission")	 	: self.PSR.opticalPhonons(energy, material, mode="Emission"  , valley="G"),
-			
-			# Intervalley processes			
-			(3, "G", "GtoL", "Absorption") 	: self.PSR.intervalleyGtoL(energy, material, mode="Absorption"),
-			(4, "G", "GtoL", "Emission")   	: self.PSR.intervalleyGtoL(energy, material, mode="Emission"),
-	
-			# L valley
-			# Acoustic phonons
-			(0, "L", "Lac", None) 			: self.PSR.acousticPhonons(energy, material, valley="L"),
-
-			# Optical phonons
-			(1, "L", "Lop", "Absorption")   : self.PSR.opticalPhonons(energy, material, mode="Absorption", valley="L"),
-			(2, "L", "Lop", "Emission") 	: self.PSR.opticalPhonons(energy, material, mode="Emission"  , valley="L"),
-			
-			# Intervalley processes			
-			(3, "L", "LtoG", "Absorption") 	: self.PSR.intervalleyLtoG(energy, material, mode="Absorption"),
-			(4, "L", "LtoG", "Emission")	: self.PSR.intervalleyLtoG(energy, material, mode="Emission"),
-			(5, "L", "LtoL", "Absorption") 	: self.PSR.intervalleyLtoL(energy, material, mode="Absorption"),
-			(6, "L", "LtoL", "Emission") 	: self.PSR.intervalleyLtoL(energy, material, mode="Emission"),
-		}
+		#
+		#	(index, valley, name, mode) : phononScatteringData
+		#
+		self.scatteringRates = {}
+
+		# Process index within each valley
+		index = {}
+
+		for valley, name, mode, method, kwargs in self.scatteringProcesses(material):
+
+			index[valley] = index[valley] + 1 if valley in index else 0
+
+			self.scatteringRates[ ( index[valley], valley, name, mode ) ] = getattr(self.PSR, method)(energy, material, **kwargs)
 
 		# Calculate sum of scattering rates (Gamma)
-		Gsum = np.zeros( len(energy) )
-		Lsum = np.zeros( len(energy) )
-		
-		for index in range(5):
+		self.buildScatteringSums( energy )
 
-			Gsum  += self.getScatteringRate( [index, "G"] ) 
-	 	
-		for index in range(7):
+	# Method to calculate the sum of scattering rates (Gamma) over the processes of
+	# each valley. Sums are added as phononScatteringData objects (no meta) with keys
+	# (None, None, "Gsum", None), (None, None, "Lsum", None) ...
+	def buildScatteringSums(self, energy):
 
-			Lsum  += self.getScatteringRate( [index, "L"] )
+		sums = {}
 
-		# Add sums to array as phononScatteringData objects (no meta)
-		self.scatteringRates[ (None, None, "Gsum", None) ] = phononScatteringData( rate = Gsum, meta = None)
-		self.scatteringRates[ (None, None, "Lsum", None) ] = phononScatteringData( rate = Lsum, meta = None)
+		for key, data in list( self.scatteringRates.items() ):
 
-	# Method to get scattering rate
-	def getScatteringRate(self, keys) :
+			if key[1] is not None:
+
+				sums.setdefault( key[1], np.zeros( len(energy) ) )
+				sums[ key[1] ] += data.get_rate()
+
+		for valley, rate in sums.items():
+
+			self.scatteringRates[ (None, None, "%ssum"%valley, None) ] = phononScatteringData( rate = rate, meta = None )
+
+	# Method to return scattering rates at temperature T. Rates depend on temperature 
+	# only through a thermal factor of each process (see phononScatteringRates.thermalFactor),
+	# so the energy dependence is reused and only the thermal factors are recomputed.
+	# Returns a new materialScatteringRates object with a copy of the material at T.
+	def atTemperature(self, T):
+
+		# Copy of material at temperature T
+		material 	= copy.copy(self.material)
+		material.T 	= T
+		material.Vt = material.kb * T
+
+		rates = materialScatteringRates( self.energy, material, scatteringRates = {} )
+
+		for key, data in self.scatteringRates.items():
+
+			meta = data.get_meta()
+
+			# Sums are rebuilt below
+			if meta is None: 
+
+				continue
+
+			scale = self.PSR.thermalFactor( material, meta ) / self.PSR.thermalFactor( self.material, meta )
+
+			rates.scatteringRates[key] = phononScatteringData( rate = data.get_rate() * scale, meta = meta )
+
+		rates.buildScatteringSums( self.energy )
+		rates.buildRegistry()
+
+		return rates
+
+	# Method to return scattering rates for a list of temperatures
+	def temperatureSweep(self, temperatures):
+
+		return [ self.atTemperature(T) for T in temperatures ]
+
+	# Method to export scattering rates as stacked tables (see importTables). Returns
+	# process keys, process metadata and tables (process + 1, energy).
+	def exportTables(self):
+
+		keys = list( self.scatteringRates.keys() )
+
+		tables = np.zeros( ( len(keys) + 1, len(self.energy) ) )
+		tables[0, :] = self.energy
+
+		for _i, key in enumerate(keys):
+
+			tables[_i + 1, :] = self.scatteringRates[key].get_rate()
+
+		return keys, [ self.scatteringRates[key].get_meta() for key in keys ], tables
+
+	# Method to build the process registry. Every combination of the components of 
+	# a process key is mapped to the process. Where a combination is shared between 
+	# processes (e.g. ["Gop"]), it maps to the first process in insertion order.
+	def buildRegistry(self):
+
+		self.registry = {}
+
+		# Valleys in order of appearance
+		self.valleys = tuple( dict.fromkeys( [ _k[1] for _k in self.scatteringRates.keys() if _k[1] is not None ] ) )
 
 		for rate_key in self.scatteringRates.keys():
 
-			if all( [k in rate_key for k in list(keys)] ):
+			components = set(rate_key)
+
+			for n in range( 1, len(components) + 1 ):
+
+				for combination in itertools.combinations( components, n ):
+
+					self.registry.setdefault( frozenset(combination), rate_key )
+
+	# Method to return the process key for a combination of key components. Returns 
+	# None if no process matches.
+	def getScatteringKey(self, keys):
+
+		return self.registry.get( frozenset(keys) )
+
+	# Method to get scattering rate
+	def getScatteringRate(self, keys) :
 
-				return self.scatteringRates[rate_key].get_rate()
+		rate_key = self.getScatteringKey(keys)
 
 		# If key is not found retrun none
-		return None		
+		return self.scatteringRates[rate_key].get_rate() if rate_key is not None else None
 
 	# Method to get scattering metadata
 	def getScatteringMeta(self, keys):
 
-		for rate_key in self.scatteringRates.keys():
+		rate_key = self.getScatteringKey(keys)
 
-			if all( [k in rate_key for k in list(keys)] ):
+		# If key is not found retrun none
+		return self.scatteringRates[rate_key].get_meta() if rate_key is not None else None
 
-				return self.scatteringRates[rate_key].get_meta()
+	# Method to return the process metadata of a valley as arrays indexed by process 
+	# index. The arrays have one extra slot for self scattering (last index).
+	#
+	#	dE 	: change in energy (eV)
+	#	Vf 	: final valley code (index into valleys)
+	#	sym : symmetry code (0 = self scattering, see symmetryCodes) 
+	#
+	def processArrays(self, valley, valleys = None):
 
-		# If key is not found retrun none
-		return None		
+		valleys = list( valleys if valleys is not None else self.valleys )
+
+		metas = [ self.getScatteringMeta( [index, valley] ) for index in range( self.processCount(valley) ) ]
+
+		dE 	= np.array( [ _m["dE"] for _m in metas ] + [0.0] )
+		Vf 	= np.array( [ valleys.index( _m["Vf"] ) for _m in metas ] + [ valleys.index(valley) ], dtype=np.uint8 )
+		sym = np.array( [ symmetryCodes[ _m["sym"] ] for _m in metas ] + [0], dtype=np.uint8 )
+
+		return dE, Vf, sym
+
+	# Method to return the number of scattering processes in a valley
+	def processCount(self, valley):
+
+		return len( [ _k for _k in self.scatteringRates.keys() if _k[1] == valley ] )
 
 
 	# Method to transform zero scattering rates into nan
@@ -130,73 +309,10 @@ class materialScatteringRates:
 		return [ np.nan if _ == 0 else _ for _ in rate ] 
 
 
-	# Method to show all scattering rates
+	# Method to show all scattering rates. Plotting lives in scatteringRatesPlot, 
+	# which is imported here such that matplotlib is only loaded when plotting.
 	def showRates(self):
 
-		# This will be plotted using gridspec
-		fig = plt.figure(constrained_layout=True, figsize=(16,9))
-		gs = gridspec.GridSpec(ncols = 3, nrows = 2, figure=fig)
-
-		# Acoustic Phonons
-		ax00 = fig.add_subplot(gs[0, 0])
-		h0,  = ax00.semilogy(self.energy, self.getScatteringRate( ["Gac"] ) )
-		h1,  = ax00.semilogy(self.energy, self.getScatteringRate( ["Lac"] ) )
-		ax00.set_xlabel("Energy $(eV)$")
-		ax00.set_ylabel("Acoustic $(s^{-1})$")
-		ax00.legend([h0,h1],["$\Gamma$ Valley","L valley"])
-
-		# Optical Phonons (Gamma)
-		ax01 = fig.add_subplot(gs[0, 1])
-		h0,  = ax01.plot(self.energy, self.zeroAsNan( self.getScatteringRate( ["Gop", "Absorption"] ) ) )
-		h1,  = ax01.plot(self.energy, self.zeroAsNan( self.getScatteringRate( ["Gop", "Emission"] ) ) )
-		ax01.set_xlabel("Energy $(eV)$")
-		ax01.set_ylabel("$\Gamma$ Optical $(s^{-1})$")
-		ax01.legend([h0,h1],["Absorption", "Emission"])
-
-		# Optical Phonons (L)
-		ax02 = fig.add_subplot(gs[0, 2])
-		h0,  = ax02.plot(self.energy, self.zeroAsNan( self.getScatteringRate( ["Lop", "Absorption"] ) ) )
-		h1,  = ax02.plot(self.energy, self.zeroAsNan( self.getScatteringRate( ["Lop", "Emission"] ) ) )
-		ax02.set_xlabel("Energy $(eV)$")
-		ax02.set_ylabel("L Optical $(s^{-1})$")
-		ax02.legend([h0,h1],["Absorption", "Emission"])
-
-
-		# Intervalley scattering (G -> L)
-		ax10 = fig.add_subplot(gs[1, 0])
-		h0,  = ax10.semilogy(self.energy, self.getScatteringRate( [ "GtoL", "Absorption"] ) )
-		h1,  = ax10.semilogy(self.energy, self.getScatteringRate( [ "GtoL", "Emission"] ) )
-		ax10.set_xlabel("Energy $(eV)$")
-		ax10.set_ylabel("($\Gamma$ $\\rightarrow$ L) Intervalley $(s^{-1})$")
-		ax10.legend([h0,h1],["Absorption", "Emission"])
-
-		# Intervalley scattering (L -> G)
-		ax11 = fig.add_subplot(gs[1, 1])
-		h0,  = ax11.semilogy(self.energy, self.getScatteringRate( ["LtoG", "Absorption"] ) )
-		h1,  = ax11.semilogy(self.energy, self.getScatteringRate( ["LtoG", "Emission"] ) )
-		ax11.set_xlabel("Energy $(eV)$")
-		ax11.set_ylabel("(L $\\rightarrow$ $\Gamma$) Intervalley $(s^{-1})$")
-		ax11.legend([h0,h1],["Absorption", "Emission"])
-
-		# Intervalley scattering (L -> L)
-		ax12 = fig.add_subplot(gs[1, 2])
-		h0,  = ax12.semilogy(self.energy, self.getScatteringRate( ["LtoL", "Absorption"] ) )
-		h1,  = ax12.semilogy(self.energy, self.getScatteringRate( ["LtoL", "Emission"] ) )
-		ax12.set_xlabel("Energy $(eV)$")
-		ax12.set_ylabel("(L $\\rightarrow$ L) Intervalley $(s^{-1})$")
-		ax12.legend([h0,h1],["Absorption", "Emission"])
-
-		# Add a tile and show plot
-		fig.suptitle("%s electron-phonon scattering rates (T = %sK)"%(self.material.name, self.material.T))
-
-		# Plot sum of scattering rates
-		fig = plt.figure()
-		ax0 = fig.add_subplot(111)
-		h0, = ax0.semilogy( self.energy, self.zeroAsNan( self.getScatteringRate( ["Gsum"] ) ) )
-		h1, = ax0.semilogy( self.energy, self.zeroAsNan( self.getScatteringRate( ["Lsum"] ) ) )
-		ax0.set_xlabel("Energy $(eV)$")
-		ax0.set_ylabel("$\Sigma \Gamma_i$ $(s^{-1})$")
-		ax0.set_title("Total Scattering Rate")
-		ax0.legend([h0,h1],["$\Gamma$ Valley","L valley"])
-
-		plt.show()
+		from .scatteringRatesPlot import showRates
+
+		showRates(self)
@@ -61,7 +61,16 @@ class phononScatteringData:
 		return self.meta
 
 	
-# Phonon Scattering Rates Class
+# Method to return the square root of the positive part of x. Transitions into 
+# final energies Ef <= 0.0 are not allowed and have zero rate. 
+def positiveSqrt(x):
+
+	return np.sqrt( np.where( x > 0.0, x, 0.0 ) )
+
+# Phonon Scattering Rates Class. Rates are calculated with vectorized numpy
+# expressions, such that energies (Ei) can be arrays of any shape. Material 
+# parameters (e.g. Vt) may be arrays which broadcast against Ei, for example 
+# Ei[:, np.newaxis] with Vt[np.newaxis, :] to obtain rates (energy, temperature).
 class phononScatteringRates:
 
 	# Namespace class
@@ -69,6 +78,27 @@ class phononScatteringRates:
 
 		pass
 
+	# Temperature dependent factor of a scattering rate given its metadata. Rates
+	# depend on temperature only through this factor: the thermal voltage for
+	# acoustic phonons, and the phonon occupation number (N or N + 1 for emission) 
+	# for optical and intervalley phonons. 
+	def thermalFactor(self, material, meta):
+
+		# Store physical constants
+		const = physicalConstants()
+
+		if meta["type"] == "acoustic":
+
+			return material.Vt
+
+		# Phonon frequency
+		w = material.wOP if meta["type"] == "optical" else material.wE
+
+		# Phonon occupation number
+		Nop = 1.0 / ( np.exp( w * const.hbar / material.Vt ) - 1 )
+
+		return Nop + 1.0 if meta["mode"] in ["E", "Emission"] else Nop
+
 	# Acoustic phonon scattering
 	def acousticPhonons(self, Ei, material, valley = "G"):
 		
@@ -122,6 +152,7 @@ class phononScatteringRates:
 			Nop += 1.0
 
 		# Increment energy
+		Ei = np.asarray( Ei, dtype=float )
 		Ef = Ei + dE  
 		
 		# Calculate prefactor
@@ -133,24 +164,18 @@ class phononScatteringRates:
 
 		F = (a / b) * c
 	
-		# Prepare empty array for scattering rates
-		GAMMA = []
-
-		# Calculate energy dependence
-		for _Ei, _Ef in zip(Ei, Ef):
-
-			# Check final energy:   Ef > 0.0 (transition allowed)
-			# Check initial energy: Ei > 0.0 (log of negative number) 
-			if _Ef > 0.0 and _Ei > 0.0:
-	
-				delta = np.abs( ( np.sqrt(_Ei) + np.sqrt( _Ef ) ) / ( np.sqrt(_Ei) - np.sqrt(_Ef) ) ) 
+		# Check final energy:   Ef > 0.0 (transition allowed)
+		# Check initial energy: Ei > 0.0 (log of negative number) 
+		allowed = ( Ef > 0.0 ) & ( Ei > 0.0 )
 
-				GAMMA.append( F * np.log( delta ) / np.sqrt(_Ei) )
+		# Substitute placeholder energies where not allowed (rate is 0.0)
+		_Ei = np.where( allowed, Ei, 1.0 )
+		_Ef = np.where( allowed, Ef, 2.0 )
 
-			# Otherwise append 0.0
-			else:
+		# Calculate energy dependence
+		delta = np.abs( ( np.sqrt(_Ei) + np.sqrt( _Ef ) ) / ( np.sqrt(_Ei) - np.sqrt(_Ef) ) ) 
 
-				GAMMA.append( 0.0 )
+		GAMMA = np.where( allowed, F * np.log( delta ) / np.sqrt(_Ei), 0.0 )
 
 		# Phonon metadata
 		META = {
@@ -164,45 +189,47 @@ class phononScatteringRates:
 
 		return phononScatteringData( np.array(GAMMA), META ) 
 
-	# Intervalley scatering (Gamma -> L) 
-	def intervalleyGtoL(self, Ei, material, mode):
-		
+	# Intervalley scattering (Vi -> Vf) for any pair of valleys in the band model
+	# of the material (material.valleys). The final density of states includes the 
+	# number of equivalent final valleys: the degeneracy of Vf, or the degeneracy 
+	# minus one for scattering between equivalent valleys (Vi = Vf). The change in 
+	# energy includes the difference of the valley minima.
+	def intervalleyPhonons(self, Ei, material, mode, Vi, Vf):
+
 		# Store physical constants
 		const = physicalConstants()
 
-		# Store effectve mass for specified valley. 
-		mass = material.effectiveMass("L")
-		
+		# Store effectve mass for final valley. 
+		mass = material.effectiveMass(Vf)
+
+		# Number of final valleys and energy gap between valleys
+		Z 	= material.valleys[Vf]["degeneracy"] - ( 1 if Vi == Vf else 0 )
+		gap = material.valleys[Vf]["energy"] - material.valleys[Vi]["energy"]
+
 		# Phonon occupation number
 		Nop = 1.0 / ( np.exp( material.wE * const.hbar / material.Vt ) - 1 )
 
 		# Phonon absorbtion
 		if mode in ["A", "Absorption"]: 
 
-			dE   = (const.hbar*material.wE) - material.D	
+			dE   = (const.hbar*material.wE) - gap
 			Nop += 0.0
 
 		# Phonon emission
 		if mode in ["E", "Emission"]: 
 
-			dE   = -(const.hbar*material.wE) - material.D
+			dE   = -(const.hbar*material.wE) - gap
 			Nop += 1.0
 
 		# Increment energy 
-		Ef = Ei + dE
+		Ef = np.asarray( Ei, dtype=float ) + dE
 
 		# Calculate prefactor incuding valley degeneracy
-		a = Nop * material.gL * np.power( mass, 1.5 ) * (material.De**2)
+		a = Nop * Z * np.power( mass, 1.5 ) * (material.De**2)
 		b = np.sqrt(2.0) * const.pi * material.rho * material.wE * (const.hbar**3)
 
-		# Prepare empty array for scattering rates
-		GAMMA = []
-
-		# Calculate energy dependence
-		for _Ef in Ef: 
-
-			# Check final energy Ef > 0.0 (transition allowed)
-			GAMMA.append( (a / b) * np.sqrt(_Ef) if _Ef > 0.0 else 0.0 )
+		# Calculate energy dependence. Check final energy Ef > 0.0 (transition allowed)
+		GAMMA = (a / b) * positiveSqrt(Ef)
 
 		# Prepare metadata
 		META = {
@@ -210,112 +237,23 @@ class phononScatteringRates:
 			"sym"	: "isotropic",
 			"mode"	: mode,
 			"dE"	: dE,
-			"Vi" 	: "G",
-			"Vf"  	: "L"
+			"Vi" 	: Vi,
+			"Vf"  	: Vf
 		}		
 
 		return phononScatteringData( np.array(GAMMA), META ) 
 
-	# Intervalley scatering (L -> Gamma) 
-	def intervalleyLtoG(self, Ei, material, mode):
-
-		# Store physical constants
-		const = physicalConstants()
-
-		# Store effectve mass for specified valley. 
-		mass = material.effectiveMass("G")
-		
-		# Phonon occupation number
-		Nop = 1.0 / ( np.exp( material.wE * const.hbar / material.Vt ) - 1 )
-
-		# Phonon absorbtion
-		if mode in ["A", "Absorption"]: 
-	
-			dE   = (const.hbar*material.wE) + material.D
-			Nop += 0.0
-
-		# Phonon emission
-		if mode in ["E", "Emission"]: 
-
-			dE   = -(const.hbar*material.wE) + material.D
-			Nop += 1.0
-
-		# Increment energy 
-		Ef   = Ei + dE
-			
-		# Calculate prefactor
-		a = Nop * np.power( mass, 1.5 )* (material.De**2)
-		b = np.sqrt(2.0) * const.pi * material.rho * material.wE * (const.hbar**3)
-
-		# Prepare empty array for scattering rates
-		GAMMA = []
-
-		# Calculate energy dependence
-		for _Ef in Ef: 
+	# Intervalley scatering (Gamma -> L) 
+	def intervalleyGtoL(self, Ei, material, mode):
 
-			# Check final energy Ef > 0.0 (transition allowed)
-			GAMMA.append( (a / b) * np.sqrt(_Ef) if _Ef > 0.0 else 0.0 )
+		return self.intervalleyPhonons(Ei, material, mode, "G", "L")
 
-		# Prepare metadata
-		META = {
-			"type"	: "intervalley",
-			"sym"	: "isotropic",
-			"mode"	: mode,
-			"dE"	: dE,
-			"Vi" 	: "L",
-			"Vf"  	: "G"
-		}		
+	# Intervalley scatering (L -> Gamma) 
+	def intervalleyLtoG(self, Ei, material, mode):
 
-		return phononScatteringData( np.array(GAMMA), META ) 
+		return self.intervalleyPhonons(Ei, material, mode, "L", "G")
 
 	# Intervalley scatering (L -> L) 
 	def intervalleyLtoL(self, Ei, material, mode):
 
-		# Store physical constants
-		const = physicalConstants()
-
-		# Store effectve mass for specified valley. 
-		mass =  material.effectiveMass("L")
-		
-		# Phonon occupation number
-		Nop = 1.0 / ( np.exp( material.wE * const.hbar / material.Vt ) - 1 )
-
-		# Phonon absorbtion
-		if mode in ["A", "Absorption"]: 
-	
-			dE   = (const.hbar*material.wE) 
-			Nop += 0.0
-
-		# Phonon emission
-		if mode in ["E", "Emission"]: 
-
-			dE   = -(const.hbar*material.wE) 
-			Nop += 1.0
-
-		# Increment energy
-		Ef = Ei + dE
-
-		# Calculate prefactor incuding valley degeneracy
-		a = Nop * ( material.gL - 1 ) * np.power( mass, 1.5 ) * (material.De**2)
-		b = np.sqrt(2.0) * const.pi * material.rho * material.wE * (const.hbar**3)
-
-		# Prepare empty array for scattering rates
-		GAMMA = []
-
-		# Calculate energy dependence
-		for _Ef in Ef: 
-
-			# Check final energy Ef > 0.0 (transition allowed)
-			GAMMA.append( (a / b) * np.sqrt(_Ef) if _Ef > 0.0 else 0.0 )
-
-		# Prepare metadata
-		META = {
-			"type"	: "intervalley",
-			"sym"	: "isotropic",
-			"mode"	: mode,
-			"dE"	: dE,
-			"Vi" 	: "L",
-			"Vf"  	: "L"
-		}		
-
-		return phononScatteringData( np.array(GAMMA), META ) 
+		return self.intervalleyPhonons(Ei, material, mode, "L", "L")
@@ -0,0 +1,159 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/solidstate -> scatteringRatesCache.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import os
+import json
+import hashlib
+import numpy as np
+
+# Import JSON encoding of configuration data
+from ..utilities.columnarStore import encodeJSON
+
+# Version of the cached tables. Increment when the scattering rate calculation
+# changes, such that stale entries are not loaded.
+cacheVersion = 2
+
+# An on-disk cache for scattering rate tables (see materialScatteringRates). Entries
+# are keyed by a hash of the material parameters and the energy grid. Each entry is
+# stored as a pair of files in the cache directory:
+#
+#	<key>.npy	: stacked tables (energy grid + rate of each process). Loaded as a
+#				  read only memory map.
+#	<key>.json	: process keys and process metadata
+#
+# The cache is bounded by size (maxBytes). When exceeded, the least recently used
+# entries are evicted. Entries are marked as used by their modification time.
+class scatteringRatesCache:
+
+	def __init__(self, path, maxBytes = 2**30):
+
+		self.path 	  = path
+		self.maxBytes = int(maxBytes)
+
+		os.makedirs(self.path, exist_ok = True)
+
+	# Method to return the cache key for material and energy grid. All scalar material
+	# parameters (rho, nu, wOP, wE, Da, De, masses, gL, D, T ...) and the valley table
+	# (masses, degeneracies, energy offsets, processes) enter the key.
+	def key(self, energy, material):
+
+		params = { _k : _v for _k, _v in sorted( vars(material).items() ) 
+			if isinstance(_v, (int, float, str, np.number)) }
+
+		valleys = json.dumps( encodeJSON( material.valleys ), sort_keys = True ) if hasattr(material, "valleys") else None
+
+		digest = hashlib.sha256()
+		digest.update( json.dumps( [cacheVersion, type(material).__name__, { _k : repr(_v) for _k, _v in params.items() }, valleys] ).encode() )
+		digest.update( np.ascontiguousarray( energy, dtype=np.float64 ).tobytes() )
+
+		return digest.hexdigest()
+
+	# Method to return file paths of a cache entry
+	def files(self, key):
+
+		return os.path.join(self.path, "%s.npy"%key), os.path.join(self.path, "%s.json"%key)
+
+	# Method to check if an entry exists
+	def contains(self, energy, material):
+
+		return all( os.path.exists(_f) for _f in self.files( self.key(energy, material) ) )
+
+	# Method to load an entry. Returns (keys, meta, tables) or None if not cached.
+	def load(self, energy, material):
+
+		tables, header = self.files( self.key(energy, material) )
+
+		try:
+
+			with open(header, "r") as f:
+
+				data = json.load(f)
+
+			tables = np.load(tables, mmap_mode = "r")
+
+		except (OSError, ValueError):
+
+			return None
+
+		# Mark entry as recently used
+		os.utime( self.files( self.key(energy, material) )[0] )
+
+		return [ tuple(_k) for _k in data["keys"] ], data["meta"], tables
+
+	# Method to store the tables of a materialScatteringRates object. Files are written
+	# under temporary names and moved into place, such that concurrent processes never
+	# read partial entries.
+	def store(self, rates):
+
+		keys, meta, tables = rates.exportTables()
+
+		path, header = self.files( self.key(rates.energy, rates.material) )
+
+		with open(path + ".%s.tmp"%os.getpid(), "wb") as f:
+
+			np.save(f, tables)
+
+		with open(header + ".%s.tmp"%os.getpid(), "w") as f:
+
+			json.dump( {"keys" : keys, "meta" : meta}, f )
+
+		os.replace(header + ".%s.tmp"%os.getpid(), header)
+		os.replace(path + ".%s.tmp"%os.getpid(), path)
+
+		# Enforce cache size
+		self.evict()
+
+	# Method to evict least recently used entries until the cache fits in maxBytes
+	def evict(self):
+
+		entries = []
+
+		for name in os.listdir(self.path):
+
+			if name.endswith(".npy"):
+
+				key = name[:-4]
+				entries.append( ( os.path.getmtime( self.files(key)[0] ), key ) )
+
+		# Size of each entry
+		size = { _k : sum( os.path.getsize(_f) for _f in self.files(_k) if os.path.exists(_f) ) for _t, _k in entries }
+		
+		total = sum( size.values() )
+
+		for _t, key in sorted(entries):
+
+			if total <= self.maxBytes:
+
+				break
+
+			for _f in self.files(key):
+
+				if os.path.exists(_f):
+
+					os.remove(_f)
+
+			total -= size[key]
@@ -0,0 +1,104 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/solidstate -> scatteringRatesPlot.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+
+# Plotting
+import matplotlib.pyplot as plt
+import matplotlib.gridspec as gridspec
+
+# Method to show all scattering rates of a materialScatteringRates object (rates). 
+# Plotting is kept out of materialScatteringRates, such that simulations do not 
+# import matplotlib.
+def showRates(rates):
+
+	# This will be plotted using gridspec
+	fig = plt.figure(constrained_layout=True, figsize=(16,9))
+	gs = gridspec.GridSpec(ncols = 3, nrows = 2, figure=fig)
+
+	# Acoustic Phonons
+	ax00 = fig.add_subplot(gs[0, 0])
+	h0,  = ax00.semilogy(rates.energy, rates.getScatteringRate( ["Gac"] ) )
+	h1,  = ax00.semilogy(rates.energy, rates.getScatteringRate( ["Lac"] ) )
+	ax00.set_xlabel("Energy $(eV)$")
+	ax00.set_ylabel("Acoustic $(s^{-1})$")
+	ax00.legend([h0,h1],["$\Gamma$ Valley","L valley"])
+
+	# Optical Phonons (Gamma)
+	ax01 = fig.add_subplot(gs[0, 1])
+	h0,  = ax01.plot(rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Gop", "Absorption"] ) ) )
+	h1,  = ax01.plot(rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Gop", "Emission"] ) ) )
+	ax01.set_xlabel("Energy $(eV)$")
+	ax01.set_ylabel("$\Gamma$ Optical $(s^{-1})$")
+	ax01.legend([h0,h1],["Absorption", "Emission"])
+
+	# Optical Phonons (L)
+	ax02 = fig.add_subplot(gs[0, 2])
+	h0,  = ax02.plot(rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Lop", "Absorption"] ) ) )
+	h1,  = ax02.plot(rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Lop", "Emission"] ) ) )
+	ax02.set_xlabel("Energy $(eV)$")
+	ax02.set_ylabel("L Optical $(s^{-1})$")
+	ax02.legend([h0,h1],["Absorption", "Emission"])
+
+
+	# Intervalley scattering (G -> L)
+	ax10 = fig.add_subplot(gs[1, 0])
+	h0,  = ax10.semilogy(rates.energy, rates.getScatteringRate( [ "GtoL", "Absorption"] ) )
+	h1,  = ax10.semilogy(rates.energy, rates.getScatteringRate( [ "GtoL", "Emission"] ) )
+	ax10.set_xlabel("Energy $(eV)$")
+	ax10.set_ylabel("($\Gamma$ $\\rightarrow$ L) Intervalley $(s^{-1})$")
+	ax10.legend([h0,h1],["Absorption", "Emission"])
+
+	# Intervalley scattering (L -> G)
+	ax11 = fig.add_subplot(gs[1, 1])
+	h0,  = ax11.semilogy(rates.energy, rates.getScatteringRate( ["LtoG", "Absorption"] ) )
+	h1,  = ax11.semilogy(rates.energy, rates.getScatteringRate( ["LtoG", "Emission"] ) )
+	ax11.set_xlabel("Energy $(eV)$")
+	ax11.set_ylabel("(L $\\rightarrow$ $\Gamma$) Intervalley $(s^{-1})$")
+	ax11.legend([h0,h1],["Absorption", "Emission"])
+
+	# Intervalley scattering (L -> L)
+	ax12 = fig.add_subplot(gs[1, 2])
+	h0,  = ax12.semilogy(rates.energy, rates.getScatteringRate( ["LtoL", "Absorption"] ) )
+	h1,  = ax12.semilogy(rates.energy, rates.getScatteringRate( ["LtoL", "Emission"] ) )
+	ax12.set_xlabel("Energy $(eV)$")
+	ax12.set_ylabel("(L $\\rightarrow$ L) Intervalley $(s^{-1})$")
+	ax12.legend([h0,h1],["Absorption", "Emission"])
+
+	# Add a tile and show plot
+	fig.suptitle("%s electron-phonon scattering rates (T = %sK)"%(rates.material.name, rates.material.T))
+
+	# Plot sum of scattering rates
+	fig = plt.figure()
+	ax0 = fig.add_subplot(111)
+	h0, = ax0.semilogy( rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Gsum"] ) ) )
+	h1, = ax0.semilogy( rates.energy, rates.zeroAsNan( rates.getScatteringRate( ["Lsum"] ) ) )
+	ax0.set_xlabel("Energy $(eV)$")
+	ax0.set_ylabel("$\Sigma \Gamma_i$ $(s^{-1})$")
+	ax0.set_title("Total Scattering Rate")
+	ax0.legend([h0,h1],["$\Gamma$ Valley","L valley"])
+
+	plt.show()
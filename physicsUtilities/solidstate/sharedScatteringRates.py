@@ -0,0 +1,100 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/solidstate -> sharedScatteringRates.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Import shared memory
+from multiprocessing import shared_memory
+
+# Import scattering rates
+from .materialScatteringRates import materialScatteringRates
+from .materialScatteringRates import importTables
+
+# Scattering rates attached in a worker process (see attachScatteringRates)
+attachedRates = None
+
+# A class to publish the scattering rate tables of a materialScatteringRates object
+# to shared memory. The rates of all processes are stacked in a single block 
+# (process, energy) and described by a small picklable descriptor (block name, 
+# shape, keys and process metadata). Worker processes attach to the block via 
+# attachScatteringRates (e.g. as pool initializer) and build materialScatteringRates
+# objects whose rates are views into the block. No rates are recalculated or copied.
+#
+#	shared = sharedScatteringRates( materialScatteringRates(energy, material) )
+#	factory = asyncFactory( attachScatteringRates, (shared.descriptor, ) )
+#	...
+#	shared.release()
+#
+class sharedScatteringRates:
+
+	def __init__(self, rates):
+
+		# Stacked tables: energy grid (row 0) followed by rates of each process
+		keys, meta, tables = rates.exportTables()
+
+		# Copy tables into shared block
+		self.block = shared_memory.SharedMemory( create = True, size = tables.nbytes )
+
+		np.ndarray( tables.shape, dtype=np.float64, buffer=self.block.buf )[:] = tables
+
+		# Descriptor passed to worker processes
+		self.descriptor = {
+			"name"		: self.block.name,
+			"shape"		: tables.shape,
+			"keys"		: keys,
+			"meta"		: meta,
+			"material"	: rates.material
+		}
+
+	# Method to free the shared block. Call once all workers are done.
+	def release(self):
+
+		self.block.close()
+		self.block.unlink()
+
+# Method to attach to published scattering rates. Returns a materialScatteringRates 
+# object whose rates are views into the shared block. The object is also stored in
+# attachedRates, such that this method can be used as a pool initializer.
+def attachScatteringRates(descriptor):
+
+	global attachedRates
+
+	# Worker processes share the resource tracker of the publishing process, which 
+	# owns the block and unlinks it in release()
+	block = shared_memory.SharedMemory( name = descriptor["name"] )
+
+	tables = np.ndarray( descriptor["shape"], dtype=np.float64, buffer=block.buf )
+
+	# Build scattering rates from views
+	scatteringRates = importTables( descriptor["keys"], descriptor["meta"], tables )
+
+	attachedRates = materialScatteringRates( tables[0, :], descriptor["material"], scatteringRates )
+
+	# Keep a reference to the block for the lifetime of the rates
+	attachedRates.block = block
+
+	return attachedRates
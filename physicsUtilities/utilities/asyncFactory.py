@@ -25,16 +25,88 @@
 #
 
 # For asyncfactory
+import numpy as np
 import multiprocessing as mp
 
+# Import shared memory
+from multiprocessing import shared_memory
+
+# Shared arrays attached in this process {name : (block, array)} (see attachArray)
+attachedArrays = {}
+
+# A numpy array in shared memory. The array is reserved by the parent process 
+# and described by a small picklable descriptor (block name, shape, dtype). Tasks
+# attach to the array via attachArray and write their results in place, such that
+# only a small descriptor is returned through the pool.
+class sharedArray:
+
+	def __init__(self, shape, dtype = np.float64):
+
+		dtype = np.dtype(dtype)
+		shape = tuple( [ int(_n) for _n in np.atleast_1d(shape) ] )
+
+		self.block = shared_memory.SharedMemory( create = True, size = max( int( np.prod(shape) ) * dtype.itemsize, 1 ) )
+		self.array = np.ndarray( shape, dtype=dtype, buffer=self.block.buf )
+
+		# Descriptor passed to worker processes
+		self.descriptor = {"name" : self.block.name, "shape" : shape, "dtype" : dtype.str}
+
+	# Method to free the shared block name. The array stays mapped in this process
+	# as long as it (or this object) is referenced.
+	def release(self):
+
+		if self.descriptor["name"] is not None:
+
+			self.block.unlink()
+			self.descriptor["name"] = None
+
+# Method to attach to a shared array in a worker process. Attached blocks are kept
+# open for the lifetime of the worker, such that tasks attach only once.
+def attachArray(descriptor):
+
+	if descriptor["name"] not in attachedArrays:
+
+		# Worker processes share the resource tracker of the parent process, which 
+		# owns the block and unlinks it in release()
+		block = shared_memory.SharedMemory( name = descriptor["name"] )
+
+		attachedArrays[ descriptor["name"] ] = ( block, 
+			np.ndarray( descriptor["shape"], dtype=np.dtype( descriptor["dtype"] ), buffer=block.buf ) )
+
+	return attachedArrays[ descriptor["name"] ][1]
+
 # Generic multiprocess class
+#
+# Tasks may write their results into shared arrays reserved by the parent process
+# (reserve) and return only a small descriptor to the callback, instead of pickling
+# results through the pool. Reserved arrays are unlinked in wait(), and remain 
+# readable in the parent process.
 class asyncFactory:
 	
-	# Initialize with function and callback
-	def __init__(self):
+	# Initialize multiprocess pool. The optional initializer is called with 
+	# initargs once in each worker process (e.g. to attach to shared memory).
+	def __init__(self, initializer = None, initargs = ()):
 		
 		# Initialize multiprocess pool
-		self.pool = mp.Pool()
+		self.pool = mp.Pool( initializer = initializer, initargs = initargs )
+
+		# Reserved shared arrays
+		self.buffers = []
+
+	# Method to reserve a shared array. Pass array.descriptor to tasks, which 
+	# attach via attachArray.
+	def reserve(self, shape, dtype = np.float64):
+
+		self.buffers.append( sharedArray( shape, dtype ) )
+
+		return self.buffers[-1]
+
+	# Method to release reserved shared arrays
+	def release(self):
+
+		for _buffer in self.buffers:
+
+			_buffer.release()
 
 	# async: call method
 	def call(self, func, callback, *args, **kwargs):
@@ -46,3 +118,5 @@ class asyncFactory:
 
 		self.pool.close()
 		self.pool.join()
+
+		self.release()
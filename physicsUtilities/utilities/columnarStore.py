@@ -0,0 +1,303 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/utilities -> columnarStore.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import os
+import json
+import zlib
+import numpy as np
+
+# Format identification written to each header
+storeFormat  = "columnarStore"
+storeVersion = 1
+
+# Column encodings
+#
+#	None 	: values are stored as is
+#	"delta" : differences of consecutive values are stored (e.g. simulation time).
+#			  The column is restored by a cumulative sum on read.
+#
+# Columns may be compressed with zlib. Compressed columns are written in chunks
+# (one zlib stream per chunk) and are decompressed on read. Uncompressed columns
+# are read as np.memmap, such that single columns are read without loading the
+# rest of the store.
+
+# Method to convert configuration data into JSON compatible objects. Numpy arrays
+# are stored with their dtype such that they are restored as arrays (see decodeJSON).
+# Other objects (e.g. material constants) are stored by class name and their scalar
+# attributes, for reference only.
+def encodeJSON(obj):
+
+	if isinstance(obj, dict):
+
+		return { str(_k) : encodeJSON(_v) for _k, _v in obj.items() }
+
+	if isinstance(obj, (list, tuple)):
+
+		return [ encodeJSON(_v) for _v in obj ]
+
+	if isinstance(obj, np.ndarray):
+
+		return {"__ndarray__" : obj.tolist(), "dtype" : str(obj.dtype)}
+
+	if isinstance(obj, np.generic):
+
+		return obj.item()
+
+	if obj is None or isinstance(obj, (bool, int, float, str)):
+
+		return obj
+
+	if isinstance(obj, type):
+
+		return {"__type__" : obj.__name__}
+
+	return {
+		"__object__" : type(obj).__name__,
+		"attrs" : { _k : encodeJSON(_v) for _k, _v in vars(obj).items()
+			if _v is None or isinstance(_v, (bool, int, float, str, np.generic, dict)) }
+	}
+
+# Method to restore configuration data from JSON (numpy arrays are restored)
+def decodeJSON(obj):
+
+	if isinstance(obj, dict):
+
+		if "__ndarray__" in obj:
+
+			return np.array( obj["__ndarray__"], dtype=obj["dtype"] )
+
+		return { _k : decodeJSON(_v) for _k, _v in obj.items() }
+
+	if isinstance(obj, list):
+
+		return [ decodeJSON(_v) for _v in obj ]
+
+	return obj
+
+# A writer for columnar stores. A store is a directory holding a JSON header and
+# one binary file per column. Columns are organized in groups (e.g. one group per
+# electric field), and each group carries attributes (scalars, dictionaries).
+#
+#	store/
+#		header.json			: format, config, groups, attributes and column layout
+#		<group>.<column>	: binary column data
+#
+# Columns are appended in chunks, such that results can be written as they are
+# produced. The header is written on close.
+class columnarWriter:
+
+	def __init__(self, path, config = None, compress = False):
+
+		self.path 	  = path
+		self.compress = compress
+
+		os.makedirs(self.path, exist_ok = True)
+
+		# Header data
+		self.header = {
+			"format"	: storeFormat,
+			"version"	: storeVersion,
+			"config"	: encodeJSON( config if config is not None else {} ),
+			"groups"	: {}
+		}
+
+		# Last value of delta encoded columns (group, column)
+		self.last = {}
+
+	# Method to create a group with attributes
+	def group(self, name, attrs = None):
+
+		if name not in self.header["groups"]:
+
+			self.header["groups"][name] = {"attrs" : {}, "columns" : {}}
+
+		self.header["groups"][name]["attrs"].update( encodeJSON( attrs if attrs is not None else {} ) )
+
+	# Method to append a chunk of data to a column
+	def append(self, name, column, data, dtype = None, encoding = None):
+
+		self.group(name)
+
+		data = np.asarray(data)
+		data = data.astype( dtype if dtype is not None else data.dtype )
+
+		columns = self.header["groups"][name]["columns"]
+
+		if column not in columns:
+
+			columns[column] = {
+				"file" 		: "%s.%s"%(name, column),
+				"dtype" 	: str(data.dtype),
+				"length" 	: 0,
+				"encoding" 	: encoding,
+				"chunks" 	: [] if self.compress else None
+			}
+
+			open( os.path.join(self.path, columns[column]["file"]), "wb" ).close()
+
+		layout = columns[column]
+
+		# Delta encoding relative to the last value of the previous chunk
+		if layout["encoding"] == "delta":
+
+			last = self.last[(name, column)] if (name, column) in self.last else 0
+
+			self.last[(name, column)] = data[-1] if len(data) > 0 else last
+
+			data = np.diff( data, prepend = last ).astype(data.dtype)
+
+		raw = np.ascontiguousarray(data).tobytes()
+
+		if self.compress:
+
+			raw = zlib.compress(raw)
+			layout["chunks"].append( len(raw) )
+
+		with open( os.path.join(self.path, layout["file"]), "ab" ) as f:
+
+			f.write(raw)
+
+		layout["length"] += len(data)
+
+	# Method to write a whole column
+	def write(self, name, column, data, dtype = None, encoding = None):
+
+		self.append(name, column, data, dtype, encoding)
+
+	# Method to write the header
+	def close(self):
+
+		with open( os.path.join(self.path, "header.json"), "w" ) as f:
+
+			json.dump( self.header, f, indent = 1 )
+
+# A group of a columnar store. Columns are read on access. The group can be read
+# like a trajectoryResult: group["time"], group["energy"], group["velocity"] return
+# arrays, group["valley"] returns valley names if the group has a "valleys" attribute
+# (see valleyCodes), and other keys return attributes.
+class columnarGroup:
+
+	def __init__(self, reader, name):
+
+		self.reader = reader
+		self.name 	= name
+		self.attrs 	= decodeJSON( reader.header["groups"][name]["attrs"] )
+		self.layout = reader.header["groups"][name]["columns"]
+
+	# Method to read a column
+	def column(self, column):
+
+		return self.reader.read( self.name, column )
+
+	# Method to return valley codes
+	def valleyCodes(self):
+
+		return self.column("valley")
+
+	def __getitem__(self, key):
+
+		if key == "valley" and "valley" in self.layout and "valleys" in self.attrs:
+
+			return np.array( self.attrs["valleys"] )[ self.valleyCodes() ]
+
+		if key in self.layout:
+
+			return self.column(key)
+
+		return self.attrs[key]
+
+	def __contains__(self, key):
+
+		return key in self.layout or key in self.attrs
+
+	def keys(self):
+
+		return list( self.layout.keys() ) + list( self.attrs.keys() )
+
+	def items(self):
+
+		return [ ( key, self[key] ) for key in self.keys() ]
+
+# A reader for columnar stores (see columnarWriter)
+class columnarReader:
+
+	def __init__(self, path):
+
+		self.path = path
+
+		with open( os.path.join(self.path, "header.json"), "r" ) as f:
+
+			self.header = json.load(f)
+
+		if self.header["format"] != storeFormat:
+
+			raise ValueError("Not a columnar store: %s"%path)
+
+		# Configuration data
+		self.config = decodeJSON( self.header["config"] )
+
+	# Method to list groups
+	def groups(self):
+
+		return list( self.header["groups"].keys() )
+
+	# Method to return a group
+	def group(self, name):
+
+		return columnarGroup(self, name)
+
+	def __getitem__(self, name):
+
+		return self.group(name)
+
+	# Method to read a column. Uncompressed columns without encoding are returned
+	# as read only memory maps.
+	def read(self, name, column):
+
+		layout = self.header["groups"][name]["columns"][column]
+		path   = os.path.join(self.path, layout["file"])
+		dtype  = np.dtype( layout["dtype"] )
+
+		if layout["length"] == 0:
+
+			data = np.zeros( 0, dtype=dtype )
+
+		elif layout["chunks"] is None:
+
+			data = np.memmap( path, dtype=dtype, mode="r", shape=( layout["length"], ) )
+
+		else:
+
+			with open(path, "rb") as f:
+
+				data = np.concatenate( [ np.frombuffer( zlib.decompress( f.read(_n) ), dtype=dtype ) for _n in layout["chunks"] ] )
+
+		if layout["encoding"] == "delta":
+
+			data = np.cumsum( data, dtype=dtype )
+
+		return data
@@ -80,4 +80,221 @@ def histogram_curve(data, bins=20, normed=True):
 
 	bincenters = np.mean(np.vstack( [binedges[0:-1],binedges[1:]] ), axis=0)
 
-	return bincenters, yhist
\ No newline at end of file
+	return bincenters, yhist
+
+# A streaming histogram accumulator. Data is added in chunks (add) and partial 
+# histograms, e.g. one per file or worker, are combined with merge. Memory use 
+# depends on the number of bins only.
+#
+#	Fixed bins 	: range = (lo, hi) gives bins of width (hi - lo) / bins. Values 
+#				  outside the range are counted in underflow and overflow. Fixed 
+#				  histograms merge if their edges are equal.
+#
+#	Auto range 	: range = None. Bin widths are powers of two and bin edges are 
+#				  multiples of the bin width. The range is fit to the first chunk,
+#				  and the histogram is coarsened (pairs of bins are combined) when 
+#				  data falls outside the range. Coarsening and merging are exact,
+#				  and auto ranged histograms always merge. At least bins/4 bins 
+#				  cover the data.
+#
+# Counts may be weighted, e.g. by dwell times for time averaged distributions. 
+# Histograms pickle, or are serialized to dictionaries (asdict, histogramFromDict).
+class streamingHistogram:
+
+	def __init__(self, bins = 300, range = None):
+
+		self.bins  = int(bins)
+		self.fixed = range is not None
+
+		# Lower edge and bin width (None until data is added in auto range mode)
+		self.lo 	= float(range[0]) if self.fixed else None
+		self.width 	= ( float(range[1]) - float(range[0]) ) / self.bins if self.fixed else None
+
+		# Upper edge of fixed bins (the last bin includes it, as in np.histogram)
+		self.hi 	= float(range[1]) if self.fixed else None
+
+		# (Weighted) counts and out of range counts
+		self.counts 	= np.zeros( self.bins )
+		self.underflow 	= 0.0
+		self.overflow 	= 0.0
+
+		# Number of values added
+		self.events = 0
+
+	# Method to return bin edges
+	def edges(self):
+
+		if self.lo is None:
+
+			return np.zeros(0)
+
+		if self.fixed:
+
+			return np.linspace( self.lo, self.hi, self.bins + 1 )
+
+		return self.lo + np.arange( self.bins + 1 ) * self.width
+
+	# Method to fit the range (auto range mode) to cover [dmin, dmax] and the 
+	# occupied bins. Occupied bins nest in the coarsened bins, so counts are 
+	# remapped exactly.
+	def extend(self, dmin, dmax, width = None):
+
+		# Initial bin width: smallest power of two which covers the data
+		if self.lo is None:
+
+			span = dmax - dmin if dmax > dmin else ( abs(dmin) if dmin != 0.0 else 1.0 )
+
+			self.width 	= 2.0**np.ceil( np.log2( span / self.bins ) )
+			self.lo 	= np.floor( dmin / self.width ) * self.width
+
+		# Occupied range
+		occupied = np.nonzero( self.counts )[0]
+
+		if len(occupied) > 0:
+
+			dmin = min( dmin, self.lo + occupied[0] * self.width )
+			dmax = max( dmax, self.lo + ( occupied[-1] + 0.5 ) * self.width )
+
+		# Coarsen until data and occupied bins are covered
+		_width = max( self.width, width if width is not None else 0.0 )
+
+		while True:
+
+			_lo = np.floor( dmin / _width ) * _width
+			_hi = _lo + self.bins * _width
+
+			if dmax < _hi:
+
+				break
+
+			_width *= 2.0
+
+		if _width != self.width or _lo != self.lo:
+
+			self.counts = np.bincount( self.remap( _lo, _width )[occupied], weights = self.counts[occupied], minlength = self.bins )
+
+			self.lo, self.width = _lo, _width
+
+	# Method to return the bin indices of the current bin centers on a coarser grid
+	def remap(self, lo, width):
+
+		centers = self.lo + ( np.arange( self.bins ) + 0.5 ) * self.width
+
+		return np.floor( ( centers - lo ) / width ).astype(np.int64)
+
+	# Method to add an array of values with optional weights (e.g. dwell times)
+	def add(self, data, weights = None):
+
+		data 	= np.ravel( np.asarray( data, dtype=np.float64 ) )
+		weights = np.ones( len(data) ) if weights is None else np.ravel( np.asarray( weights, dtype=np.float64 ) )
+
+		if len(data) == 0:
+
+			return
+
+		if not self.fixed:
+
+			self.extend( np.min(data), np.max(data) )
+
+		# Fixed bins are located against the bin edges, such that values are binned 
+		# as in np.histogram. The last bin includes the upper edge.
+		if self.fixed:
+
+			index = np.searchsorted( self.edges(), data, side = "right" ) - 1
+
+			index[ data == self.hi ] = self.bins - 1
+
+		else:
+
+			index = np.floor( ( data - self.lo ) / self.width ).astype(np.int64)
+
+		inside = ( index >= 0 ) & ( index < self.bins )
+
+		self.underflow 	+= np.sum( weights[ index < 0 ] )
+		self.overflow 	+= np.sum( weights[ index >= self.bins ] )
+		self.counts 	+= np.bincount( index[inside], weights = weights[inside], minlength = self.bins )
+		self.events 	+= len(data)
+
+	# Method to merge another histogram into this histogram
+	def merge(self, other):
+
+		if self.fixed != other.fixed or self.bins != other.bins:
+
+			raise ValueError("streamingHistogram: cannot merge fixed and auto ranged histograms or different bins")
+
+		if self.fixed and not np.array_equal( self.edges(), other.edges() ):
+
+			raise ValueError("streamingHistogram: cannot merge fixed histograms with different edges")
+
+		if other.lo is None:
+
+			return self
+
+		if self.fixed:
+
+			self.counts = self.counts + other.counts
+
+		else:
+
+			# Cover the occupied range of other with at least its bin width
+			occupied = np.nonzero( other.counts )[0]
+
+			if len(occupied) > 0:
+
+				self.extend( other.lo + occupied[0] * other.width, other.lo + ( occupied[-1] + 0.5 ) * other.width, other.width )
+
+				self.counts = self.counts + np.bincount( other.remap( self.lo, self.width )[occupied], weights = other.counts[occupied], minlength = self.bins )
+
+		self.underflow 	+= other.underflow
+		self.overflow 	+= other.overflow
+		self.events 	+= other.events
+
+		return self
+
+	# Method to return a histogram curve (bin centers, counts) as histogram_curve. 
+	# In auto range mode the curve is trimmed to the occupied bins.
+	def curve(self, normed = False):
+
+		edges, counts = self.edges(), self.counts
+
+		if not self.fixed and np.any( counts > 0 ):
+
+			occupied = np.nonzero( counts > 0 )[0]
+			edges, counts = edges[ occupied[0] : occupied[-1] + 2 ], counts[ occupied[0] : occupied[-1] + 1 ]
+
+		if normed and np.sum( counts ) > 0:
+
+			counts = counts / np.sum( counts ) / np.diff( edges )
+
+		return ( edges[:-1] + edges[1:] ) / 2.0, counts
+
+	# Method to serialize histogram to a dictionary
+	def asdict(self):
+
+		return {
+			"bins" 		: self.bins,
+			"fixed" 	: self.fixed,
+			"lo"		: self.lo,
+			"width" 	: self.width,
+			"hi"		: self.hi,
+			"counts" 	: self.counts.tolist(),
+			"underflow" : self.underflow,
+			"overflow" 	: self.overflow,
+			"events" 	: self.events
+		}
+
+# Method to restore a streaming histogram from a dictionary (see asdict)
+def histogramFromDict(state):
+
+	histogram = streamingHistogram( state["bins"] )
+
+	histogram.fixed 	= state["fixed"]
+	histogram.lo 		= state["lo"]
+	histogram.width 	= state["width"]
+	histogram.hi 		= state["hi"]
+	histogram.counts 	= np.array( state["counts"], dtype=np.float64 )
+	histogram.underflow = state["underflow"]
+	histogram.overflow 	= state["overflow"]
+	histogram.events 	= state["events"]
+
+	return histogram
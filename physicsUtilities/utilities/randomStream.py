@@ -0,0 +1,101 @@
+# ---------------------------------------------------------------------------------
+# 	physicsUtilities/utilities -> randomStream.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Bit generators available to random streams. Both support independent streams
+# derived from a single seed via np.random.SeedSequence.
+bitGenerators = {
+	"PCG64"		: np.random.PCG64,
+	"Philox"	: np.random.Philox,
+}
+
+# A seedable random number stream built on numpy Generator. A stream is identified
+# by a master seed and a spawn key (e.g. (field,) or (field, worker)), such that any
+# stream of a simulation can be replayed bit-for-bit from the master seed alone. If
+# no seed is given, fresh entropy is drawn from the OS and stored in self.seed.
+#
+# Scalar draws (single particle simulation) are served from a buffer of uniform
+# numbers which is refilled in blocks. Array draws are taken from the generator.
+class randomStream:
+
+	def __init__(self, seed = None, key = (), generator = "PCG64", block = 4096):
+
+		# Seed sequence for this stream
+		self.sequence = np.random.SeedSequence( entropy = seed, spawn_key = tuple(key) )
+
+		# Store stream identification
+		self.seed 	   = self.sequence.entropy
+		self.key 	   = tuple(key)
+		self.generator = generator
+
+		# Initialize generator
+		self.rng = np.random.Generator( bitGenerators[generator]( self.sequence ) )
+
+		# Buffer of uniform numbers for scalar draws
+		self.block 	  = int(block)
+		self.buffer   = []
+		self.position = 0
+
+	# Method to refill the scalar buffer
+	def refill(self):
+
+		self.buffer   = self.rng.random( self.block ).tolist()
+		self.position = 0
+
+	# Throw random number(s) on interval [0, 1). Returns a float if size is None,
+	# otherwise a numpy array of given size.
+	def random(self, size = None):
+
+		if size is not None:
+
+			return self.rng.random( size )
+
+		if self.position == len(self.buffer):
+
+			self.refill()
+
+		self.position += 1
+
+		return self.buffer[ self.position - 1 ]
+
+	# Method to derive an independent child stream. The child key is the key of
+	# this stream extended by key (int or tuple).
+	def spawn(self, key):
+
+		key = tuple(key) if isinstance(key, (tuple, list)) else (int(key), )
+
+		return randomStream( self.seed, self.key + key, self.generator, self.block )
+
+	# Method to return a description of the stream which can be used to replay it
+	def describe(self):
+
+		return {
+			"seed"		: self.seed,
+			"key"		: self.key,
+			"generator"	: self.generator
+		}
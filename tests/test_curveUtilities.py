@@ -0,0 +1,78 @@
+# ---------------------------------------------------------------------------------
+# 	tests -> test_curveUtilities.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Import streaming histogram
+from physicsUtilities.utilities.curveUtilities import streamingHistogram
+
+# Fixed bins must bin as np.histogram, including samples at the range maximum
+def test_fixed_histogram_range_maximum():
+
+	rng = np.random.default_rng(1)
+
+	for _ in range(50):
+
+		data = rng.normal( rng.uniform(-1e7, 1e7), rng.uniform(1e-3, 1e7), 1000 )
+
+		histogram = streamingHistogram( 300, ( np.min(data), np.max(data) ) )
+		histogram.add( data )
+
+		counts, _ = np.histogram( data, 300, ( np.min(data), np.max(data) ) )
+
+		assert np.array_equal( histogram.counts, counts )
+		assert histogram.overflow == 0.0 and histogram.underflow == 0.0
+
+	# Range maximum as a sample
+	histogram = streamingHistogram( 7, (0.1, 0.7) )
+	histogram.add( [0.1, 0.7, 0.75, 0.05] )
+
+	assert histogram.counts[0] == 1.0 and histogram.counts[-1] == 1.0
+	assert histogram.overflow == 1.0 and histogram.underflow == 1.0
+
+# Merged partial histograms (auto range) must equal a histogram of all data
+def test_auto_histogram_merge():
+
+	rng  = np.random.default_rng(2)
+	data = rng.normal( 5e6, 3e6, 100000 )
+
+	parts = [ streamingHistogram(300) for _ in range(4) ]
+
+	for _histogram, _data in zip( parts, np.array_split( data, 4 ) ):
+
+		_histogram.add( _data )
+
+	merged = parts[0]
+
+	for _histogram in parts[1:]:
+
+		merged.merge( _histogram )
+
+	counts, _ = np.histogram( data, merged.edges() )
+
+	assert np.array_equal( merged.counts, counts )
+	assert merged.events == len(data)
@@ -0,0 +1,130 @@
+# ---------------------------------------------------------------------------------
+# 	tests -> test_ensembleMonteCarlo.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Import physical and material constants
+from physicsUtilities.solidstate.materialConstants import GaAs
+
+# Import scattering rates
+from physicsUtilities.solidstate.materialScatteringRates import materialScatteringRates
+
+# Import Monte Carlo simulations
+from physicsUtilities.scattering.scatteringMonteCarlo import scatteringMonteCarlo
+from physicsUtilities.scattering.ensembleMonteCarlo import ensembleMonteCarlo
+
+# Fields (V/cm) below and above the onset of intervalley transfer
+fields = [3e3, 1.5e4]
+
+energy = np.linspace(0.0, 2.0, 500)
+rates  = materialScatteringRates( energy, GaAs() )
+
+# Drift velocity and L valley occupancy of independent single particle simulations
+# (one random number stream each). Returns means and standard errors of the means.
+def singleParticle(field, runs = 8):
+
+	samples = []
+
+	for _j in range(runs):
+
+		Simulation = scatteringMonteCarlo( {
+			"material"	: GaAs(),
+			"energy"	: energy,
+			"field"		: field,
+			"events"	: 10000,
+			"warmup"	: 2000,
+			"seed"		: 5,
+			"stream"	: (_j, ),
+			"statistics": True,
+			"rates"		: rates
+		} )
+		Simulation.randomizeInitial()
+		Simulation.run()
+
+		samples.append( ( Simulation.result["velocity"], Simulation.result.occupancy("L") ) )
+
+	samples = np.array(samples)
+
+	return np.mean( samples, axis = 0 ), np.std( samples, axis = 0, ddof = 1 ) / np.sqrt(runs)
+
+# Drift velocity and L valley occupancy of an ensemble carrying all fields. Returns
+# means and standard errors (scatter between electrons) keyed by field.
+def ensemble(**kwargs):
+
+	Simulation = ensembleMonteCarlo( dict( {
+		"material"	: GaAs(),
+		"energy"	: energy,
+		"field"		: fields,
+		"events"	: 400,
+		"electrons"	: 200,
+		"warmup"	: 400,
+		"seed"		: 5,
+		"statistics": True,
+		"rates"		: rates
+	}, **kwargs ) )
+	Simulation.randomizeInitial()
+	Simulation.run()
+
+	results, acc, n = {}, Simulation.accumulators, Simulation.electrons
+
+	for _i, ( field, result ) in enumerate( Simulation.fieldResults().items() ):
+
+		occupancy = acc["dwell"][ 1, _i * n : ( _i + 1 ) * n ] / acc["time"][ _i * n : ( _i + 1 ) * n ]
+
+		results[field] = ( 
+			np.array( [ result["velocity"], result.occupancy("L") ] ), 
+			np.array( [ result.standardError("velocity"), np.std( occupancy, ddof = 1 ) / np.sqrt(n) ] ) 
+		)
+
+	return results
+
+# Means agree if they differ by less than four combined standard errors
+def agree(a, b):
+
+	return np.all( np.abs( a[0] - b[0] ) < 4.0 * np.sqrt( a[1]**2 + b[1]**2 ) )
+
+# Ensemble averages must reproduce the single particle averages
+def test_ensemble_single_particle():
+
+	results = ensemble()
+
+	for field in fields:
+
+		assert agree( results[field], singleParticle(field) )
+
+# Alias tables and variable Gamma must reproduce the default scheme
+def test_ensemble_schemes():
+
+	default = ensemble()
+
+	for kwargs in [ {"alias" : True}, {"bands" : 4} ]:
+
+		results = ensemble( **kwargs )
+
+		for field in fields:
+
+			assert agree( results[field], default[field] )
@@ -0,0 +1,128 @@
+# ---------------------------------------------------------------------------------
+# 	tests -> test_phononScatteringRates.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+# Import physical and material constants
+from physicsUtilities.utilities.physicalConstants import physicalConstants
+from physicsUtilities.solidstate.materialConstants import GaAs
+
+# Import phonon scattering rates
+from physicsUtilities.solidstate.phononScatteringRates import phononScatteringRates
+
+# Energy grid including energies below the phonon energies and Ei <= 0.0
+energy = np.linspace(-0.1, 2.0, 5001)
+
+# Reference optical phonon rates (per energy loop)
+def opticalLoop(Ei, material, mode):
+
+	const = physicalConstants()
+
+	Nop = 1.0 / ( np.exp( material.wOP * const.hbar / material.Vt ) - 1 ) + ( 1.0 if mode == "E" else 0.0 )
+	dE 	= const.hbar * material.wOP * ( -1.0 if mode == "E" else 1.0 )
+
+	a = Nop * (const.q**2) * np.sqrt( material.effectiveMass("G") ) * material.wOP
+	b = np.sqrt(2.0) * const.hbar * (4.0 * const.pi * const.e0 * const.q)
+	c = (1.0 / material.epI) - (1.0/material.ep0)
+
+	F, GAMMA = (a / b) * c, []
+
+	for _Ei, _Ef in zip(Ei, Ei + dE):
+
+		if _Ef > 0.0 and _Ei > 0.0:
+
+			delta = np.abs( ( np.sqrt(_Ei) + np.sqrt( _Ef ) ) / ( np.sqrt(_Ei) - np.sqrt(_Ef) ) ) 
+
+			GAMMA.append( F * np.log( delta ) / np.sqrt(_Ei) )
+
+		else:
+
+			GAMMA.append( 0.0 )
+
+	return np.array(GAMMA)
+
+# Reference intervalley phonon rates (per energy loop)
+def intervalleyLoop(Ei, material, mode, Vi, Vf):
+
+	const = physicalConstants()
+
+	Z 	= material.valleys[Vf]["degeneracy"] - ( 1 if Vi == Vf else 0 )
+	gap = material.valleys[Vf]["energy"] - material.valleys[Vi]["energy"]
+
+	Nop = 1.0 / ( np.exp( material.wE * const.hbar / material.Vt ) - 1 ) + ( 1.0 if mode == "E" else 0.0 )
+	dE 	= const.hbar * material.wE * ( -1.0 if mode == "E" else 1.0 ) - gap
+
+	a = Nop * Z * np.power( material.effectiveMass(Vf), 1.5 ) * (material.De**2)
+	b = np.sqrt(2.0) * const.pi * material.rho * material.wE * (const.hbar**3)
+
+	return np.array( [ (a / b) * np.sqrt(_Ef) if _Ef > 0.0 else 0.0 for _Ef in Ei + dE ] )
+
+# Vectorized rates must equal the per energy loop
+def test_rates_match_loop():
+
+	rates = phononScatteringRates()
+
+	for T in [77, 300]:
+
+		material = GaAs(T)
+
+		for mode in ["A", "E"]:
+
+			assert np.array_equal( rates.opticalPhonons( energy, material, mode ).get_rate(), 
+				opticalLoop( energy, material, mode ) )
+
+			for Vi, Vf in [ ("G", "L"), ("L", "G"), ("L", "L") ]:
+
+				assert np.array_equal( rates.intervalleyPhonons( energy, material, mode, Vi, Vf ).get_rate(), 
+					intervalleyLoop( energy, material, mode, Vi, Vf ) )
+
+# Energies (energy, 1) broadcast against temperatures (1, temperature)
+def test_rates_energy_temperature():
+
+	rates, T = phononScatteringRates(), np.array( [77.0, 150.0, 300.0, 500.0] )
+
+	# Acoustic rates are defined for Ei >= 0.0
+	Ei = energy[ energy >= 0.0 ]
+
+	material = GaAs()
+	material.Vt = material.kb * T[np.newaxis, :]
+
+	for method, args in [
+		( rates.acousticPhonons, () ),
+		( rates.opticalPhonons, ("A", ) ), 
+		( rates.opticalPhonons, ("E", ) ), 
+		( rates.intervalleyGtoL, ("E", ) ), 
+		( rates.intervalleyLtoG, ("A", ) ),
+		( rates.intervalleyLtoL, ("E", ) ) ]:
+
+		table = method( Ei[:, np.newaxis], material, *args ).get_rate()
+
+		assert table.shape == ( len(Ei), len(T) )
+
+		for _j, _T in enumerate(T):
+
+			assert np.array_equal( table[:, _j], method( Ei, GaAs(_T), *args ).get_rate() )
@@ -0,0 +1,100 @@
+# ---------------------------------------------------------------------------------
+# 	tests -> test_velocityFieldSimulation.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#	
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#	
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#	
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import os
+import sys
+import pickle
+import numpy as np
+
+# The velocity field scripts import their sibling modules directly
+sys.path.insert(1, os.path.join( os.path.dirname(__file__), "..", "physicsSimulations", "velocityField" ) )
+
+# Import physical and material constants
+from physicsUtilities.solidstate.materialConstants import GaAs
+
+# Import async factory (multiprocessing)
+from physicsUtilities.utilities.asyncFactory import asyncFactory
+
+# Import velocity field simulation
+from velocityFieldSimulation import velocityFieldSimulation, simulateFieldShared
+
+# Shared memory tasks must carry buffer descriptors, not the result buffers
+def test_shared_task_is_small():
+
+	config = {
+		"material"	: GaAs(),
+		"energy"	: np.linspace(0.0, 2.0, 1000),
+		"field"		: np.linspace(300, 2e4, 100),
+		"events"	: 100000,
+		"seed"		: 1,
+		"shared"	: True
+	}
+
+	Simulation = velocityFieldSimulation(config)
+
+	factory = asyncFactory()
+	Simulation.reserve_columns( factory, len( config["field"] ) )
+
+	try:
+
+		reserved = sum( [ _buffer.array.nbytes for _buffer in Simulation.buffers.values() ] )
+		task 	 = pickle.dumps( ( simulateFieldShared, Simulation.shared_task( 99, 99 ) ) )
+
+		assert reserved > 10 * 2**20
+		assert len(task) < 64 * 2**10
+
+	finally:
+
+		factory.wait()
+
+# Shared memory results must equal results returned through the pool (default
+# and reduced precision)
+def test_shared_results_identical():
+
+	for precision in [np.float64, np.float32]:
+
+		config = lambda **kwargs: dict( {
+			"material"	: GaAs(),
+			"energy"	: np.linspace(0.0, 2.0, 500),
+			"field"		: [1e3, 1e4],
+			"events"	: 2000,
+			"seed"		: 3,
+			"precision"	: precision
+		}, **kwargs )
+
+		pooled, shared = velocityFieldSimulation( config() ), velocityFieldSimulation( config( shared = True ) )
+		pooled.run()
+		shared.run()
+
+		for field in [1e3, 1e4]:
+
+			for key in ["time", "valley", "energy", "velocity"]:
+
+				assert pooled.result[field][key].dtype == shared.result[field][key].dtype
+				assert np.array_equal( pooled.result[field][key], shared.result[field][key] )
+
+			assert shared.result[field]["velocity"].dtype == precision